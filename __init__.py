@@ -1,10 +1,14 @@
 import bpy
 
+from . import utilities
+from . import runtime
+from . import symmetry
 from . import ui_operators
 from . import ui
 from . import properties
 from . import operators
 from . import action_operators
+from . import io_operators
 
 bl_info = {
     "name": "Action poser",
@@ -21,17 +25,25 @@ bl_info = {
 def register():
     from bpy.utils import register_class
 
+    utilities.register()
+    runtime.register()
+    symmetry.register()
     properties.register()
     operators.register()
     action_operators.register()
+    io_operators.register()
     ui_operators.register()
     ui.register()
 
 def unregister():
     from bpy.utils import unregister_class
 
+    utilities.unregister()
+    runtime.unregister()
+    symmetry.unregister()
     properties.unregister()
     operators.unregister()
     action_operators.unregister()
+    io_operators.unregister()
     ui_operators.unregister()
     ui.unregister()
\ No newline at end of file
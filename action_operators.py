@@ -1,4 +1,5 @@
 import bpy
+from . utilities import remove_flat_curves, decimate_action, clear_list_cache
 
 class DATA_OT_ap_action_new(bpy.types.Operator):
     bl_idname = "armature.ap_action_new"
@@ -27,6 +28,7 @@ class DATA_OT_ap_action_new(bpy.types.Operator):
             action.name = prefs.pose_prefix + action.name
         elif ap_pose.type == 'COMBO':
             action.name = prefs.combo_prefix + action.name
+        clear_list_cache()
 
         return {'FINISHED'}
 
@@ -91,6 +93,7 @@ class DATA_OT_ap_remove_flat_curves(bpy.types.Operator):
     bl_options = {"REGISTER", "UNDO"}
 
     idx: bpy.props.IntProperty()
+    tolerance: bpy.props.FloatProperty(name='Tolerance', default=0.00001, min=0.0, precision=6, description='Curves whose values stay within this range are considered flat')
 
     @classmethod
     def poll(cls, context):
@@ -106,29 +109,89 @@ class DATA_OT_ap_remove_flat_curves(bpy.types.Operator):
         ap_pose = armature.ap_poses[self.idx]
         action = ap_pose.action
         ap_state = armature.ap_state
-        ap_bone_transforms = armature.ap_bone_transforms
-
-        for fcurve in action.fcurves:
-            points = fcurve.keyframe_points
-            first_value = None
-            is_flat_curve = True
-            for point in points:
-                coordinates = point.co
-                value = round(coordinates[1], 5)
-                if first_value is None:  # storing the value of the first point.
-                    first_value = value
-                else:  # comparing every point's value to the first value.
-                    if value != first_value:
-                        is_flat_curve = False
-                        break
-            if is_flat_curve:
-                action.fcurves.remove(fcurve)
-        
-        for group in action.groups:
-            if len(group.channels) == 0:
-                action.groups.remove(group)
+
+        curves, groups = remove_flat_curves(action, self.tolerance)
                 
-        self.report({'INFO'}, 'Flat curves removed')
+        self.report({'INFO'}, 'Flat curves removed: %d curves, %d groups' %(curves, groups))
+        return {'FINISHED'}
+
+
+class DATA_OT_ap_remove_flat_curves_all(bpy.types.Operator):
+    bl_idname = "armature.ap_remove_flat_curves_all"
+    bl_label = "Remove Flat Curves (All Poses)"
+    bl_description = "Removes flat curves from the actions of all poses in one pass"
+    bl_options = {"REGISTER", "UNDO"}
+
+    tolerance: bpy.props.FloatProperty(name='Tolerance', default=0.00001, min=0.0, precision=6, description='Curves whose values stay within this range are considered flat')
+
+    @classmethod
+    def poll(cls, context):
+        return context.mode == 'POSE' and any(pose.action for pose in context.active_object.data.ap_poses)
+
+    def execute(self, context):
+        armature = context.active_object.data
+        actions = {pose.action for pose in armature.ap_poses if pose.action}
+
+        curves = 0
+        groups = 0
+        for action in actions:
+            action_curves, action_groups = remove_flat_curves(action, self.tolerance)
+            curves += action_curves
+            groups += action_groups
+
+        self.report({'INFO'}, 'Removed %d flat curves and %d groups from %d actions' %(curves, groups, len(actions)))
+        return {'FINISHED'}
+
+
+class DATA_OT_ap_action_decimate(bpy.types.Operator):
+    bl_idname = "armature.ap_action_decimate"
+    bl_label = "Decimate Keys"
+    bl_description = "Removes redundant keys from pose actions while keeping the curves within the tolerance"
+    bl_options = {"REGISTER", "UNDO"}
+
+    mode : bpy.props.EnumProperty(name='Mode', description='Choose which actions to decimate', items={('ALL', 'All', 'All', 0), ('ACTIVE', 'Active', 'Active', 1)}, default='ACTIVE')
+    tolerance: bpy.props.FloatProperty(name='Tolerance', default=0.001, min=0.0, precision=5, description='Largest allowed deviation of a curve from its original shape')
+    samples: bpy.props.IntProperty(name='Samples', default=4, min=1, max=64, description='Samples per frame used to measure the error')
+
+    @classmethod
+    def poll(cls, context):
+        armature = context.active_object.data
+        ap_poses = armature.ap_poses
+
+        # Poll can't see the mode, ALL has to stay available when the active pose has no action yet
+        return context.mode == 'POSE' and ap_poses
+
+    def execute(self, context):
+        armature = context.active_object.data
+
+        if self.mode == 'ACTIVE':
+            poses = [armature.ap_poses[armature.ap_poses_index]]
+            if not poses[0].action:
+                self.report({'ERROR'}, 'Active pose has no action: %s' %(poses[0].name))
+                return {'CANCELLED'}
+        else:
+            poses = [pose for pose in armature.ap_poses if pose.action]
+
+        # Poses sharing an action must keep the start and end frames of all of them
+        actions = {}
+        for pose in poses:
+            actions.setdefault(pose.action, set()).update((pose.start_frame, pose.end_frame))
+
+        before = 0
+        after = 0
+        lines = []
+        for action, frames in actions.items():
+            action_before, action_after = decimate_action(action, self.tolerance, tuple(frames), self.samples)
+            lines.append('%s: %d -> %d keys' %(action.name, action_before, action_after))
+            before += action_before
+            after += action_after
+
+        name = 'AP Decimate Report'
+        text = bpy.data.texts.get(name) or bpy.data.texts.new(name)
+        text.from_string('\n'.join(lines) + '\n')
+
+        removed = 100.0 * (before - after) / before if before else 0.0
+        self.report({'INFO'}, 'Decimated %d actions: %d -> %d keys (%.1f%% removed), per action counts in text: %s' %(len(actions), before, after, removed, text.name))
         return {'FINISHED'}
 
 
@@ -153,6 +216,7 @@ class DATA_OT_ap_action_rename(bpy.types.Operator):
         ap_pose = armature.ap_poses[armature.ap_poses_index]
         action = ap_pose.action
         action.name = self.text
+        clear_list_cache()
 
         return {'FINISHED'}
 
@@ -168,6 +232,8 @@ class DATA_OT_ap_action_rename(bpy.types.Operator):
 
 classes = [
     DATA_OT_ap_remove_flat_curves,
+    DATA_OT_ap_remove_flat_curves_all,
+    DATA_OT_ap_action_decimate,
     DATA_OT_ap_action_new,
     DATA_OT_ap_action_duplicate,
     DATA_OT_ap_action_delete,
@@ -0,0 +1,97 @@
+"""Writer for baked Action Poser files. The layout is described and read in bake_reader."""
+import numpy as np
+
+from . bake_reader import (MAGIC, VERSION, ALIGN, SAMPLE_SIZE, SECTIONS, HEADER, INPUT, POSE, TERM, BONE, DTYPES)
+from . evaluator import REST
+
+def bake_setup(setup: dict) -> dict:
+    """Packs an evaluator setup into the flat section arrays of a baked file."""
+    strings = {}
+
+    def string(value: str) -> int:
+        return strings.setdefault(value, len(strings))
+
+    inputs = np.zeros(len(setup['inputs']), dtype=INPUT)
+    for i, spec in enumerate(setup['inputs']):
+        prop = 'data_path' in spec
+        inputs[i] = (
+            string(spec['name']),
+            1 if prop else 0,
+            string(spec['target']),
+            string(spec['data_path'] if prop else spec['bone_target']),
+            string(spec.get('transform_type', '')),
+            string(spec.get('transform_space', '')),
+            string(spec.get('rot_mode', '')),
+        )
+
+    pose_index = {pose['name']: i for i, pose in enumerate(setup['poses'])}
+    poses = np.zeros(len(setup['poses']), dtype=POSE)
+    terms = []
+    combos = []
+    bones = []
+    samples = []
+    sample_count = 0
+
+    for i, pose in enumerate(setup['poses']):
+        links = [pose_index[name] for name in pose.get('combo', []) if name in pose_index]
+        poses[i] = (
+            string(pose['name']),
+            1 if pose['type'] == 'COMBO' else 0,
+            string(pose['mix']),
+            len(terms), len(pose['terms']),
+            len(combos), len(links),
+            len(bones), len(pose['bones']),
+        )
+        terms += [tuple(term) for term in pose['terms']]
+        combos += links
+
+        for bone in pose['bones']:
+            channels = np.hstack([bone[channel] for channel in REST.keys()])
+            bones.append((string(bone['name']), bone['influence'], sample_count, len(channels)))
+            samples.append(channels)
+            sample_count += len(channels)
+
+    data = '\0'.join(strings.keys()).encode()
+    table = np.zeros((len(strings), 2), dtype=DTYPES['strings'])
+    offset = 0
+    for i, value in enumerate(strings.keys()):
+        length = len(value.encode())
+        table[i] = (offset, length)
+        offset += length + 1
+
+    return {
+        'strings': table,
+        'string_data': np.frombuffer(data, dtype=DTYPES['string_data']),
+        'inputs': inputs,
+        'poses': poses,
+        'terms': np.array(terms, dtype=TERM),
+        'combos': np.array(combos, dtype=DTYPES['combos']),
+        'bones': np.array(bones, dtype=BONE),
+        'samples': np.vstack(samples).astype(DTYPES['samples']) if samples else np.zeros((0, SAMPLE_SIZE), dtype=DTYPES['samples']),
+    }
+
+def write_baked(path: str, sections: dict) -> int:
+    """Writes packed sections to a file. Returns the file size in bytes."""
+    header = np.zeros(1, dtype=HEADER)
+    header['magic'] = MAGIC
+    header['version'] = VERSION
+
+    offset = align(HEADER.itemsize)
+    for name in SECTIONS:
+        array = sections[name]
+        header[name + '_offset'] = offset
+        header[name + '_count'] = len(array)
+        offset = align(offset + array.nbytes)
+
+    with open(path, 'wb') as file:
+        file.write(header.tobytes())
+        for name in SECTIONS:
+            file.write(b'\0' * (int(header[name + '_offset'][0]) - file.tell()))
+            file.write(np.ascontiguousarray(sections[name]).tobytes())
+        size = file.tell()
+
+    return size
+
+def align(offset: int) -> int:
+    """Rounds an offset up to the section alignment."""
+    return (offset + ALIGN - 1) // ALIGN * ALIGN
@@ -0,0 +1,139 @@
+"""Reader for baked Action Poser files (.apbk).
+
+Standalone on purpose: it only needs NumPy, so engine tools can copy it as is. load() memory maps the file
+and every section comes back as a NumPy view into the mapping, nothing gets copied or parsed up front.
+
+Layout, little endian, every section aligned to 16 bytes:
+    header      HEADER, offset and count of every section
+    strings     (count, 2) uint32 offset and length into string_data
+    string_data utf-8 bytes
+    inputs      INPUT records: driver channel definitions
+    poses       POSE records: mix mode, term, combo and bone ranges
+    terms       TERM records: normalized = clamp(min(value[input] * scale + offset), 0, 1) over a pose's terms
+    combos      uint32 indices of the poses that trigger a combo
+    bones       BONE records: constraint influence and sample range per pose bone
+    samples     (count, 10) float32 delta transforms: location xyz, rotation quaternion wxyz, scale xyz,
+                sampled evenly from start_frame (normalized 0) to end_frame (normalized 1)
+"""
+import numpy as np
+
+MAGIC = b'APBK'
+VERSION = 1
+ALIGN = 16
+SAMPLE_SIZE = 10
+
+SECTIONS = ['strings', 'string_data', 'inputs', 'poses', 'terms', 'combos', 'bones', 'samples']
+
+HEADER = np.dtype([('magic', 'S4'), ('version', '<u4')] + [(name + suffix, '<u8') for name in SECTIONS for suffix in ('_offset', '_count')])
+
+INPUT = np.dtype([
+    ('name', '<u4'),
+    ('kind', '<u4'),        # 0 bone transform, 1 property path
+    ('target', '<u4'),
+    ('source', '<u4'),      # bone name or data path
+    ('channel', '<u4'),
+    ('space', '<u4'),
+    ('rot_mode', '<u4'),
+])
+
+POSE = np.dtype([
+    ('name', '<u4'),
+    ('type', '<u4'),        # 0 pose, 1 combo
+    ('mix', '<u4'),
+    ('term_start', '<u4'),
+    ('term_count', '<u4'),
+    ('combo_start', '<u4'),
+    ('combo_count', '<u4'),
+    ('bone_start', '<u4'),
+    ('bone_count', '<u4'),
+])
+
+TERM = np.dtype([('input', '<u4'), ('scale', '<f4'), ('offset', '<f4')])
+
+BONE = np.dtype([
+    ('name', '<u4'),
+    ('influence', '<f4'),
+    ('sample_start', '<u4'),
+    ('sample_count', '<u4'),
+])
+
+DTYPES = {
+    'strings': np.dtype('<u4'),
+    'string_data': np.dtype('u1'),
+    'inputs': INPUT,
+    'poses': POSE,
+    'terms': TERM,
+    'combos': np.dtype('<u4'),
+    'bones': BONE,
+    'samples': np.dtype('<f4'),
+}
+
+SHAPES = {'strings': 2, 'samples': SAMPLE_SIZE}
+
+class BakedPoses:
+    """Sections of a baked file as views into its memory mapping."""
+
+    def __init__(self, sections: dict):
+        for name, array in sections.items():
+            setattr(self, name, array)
+
+    def string(self, index: int) -> str:
+        """Returns a string from the string table."""
+        offset, length = self.strings[index]
+        return self.string_data[offset:offset + length].tobytes().decode()
+
+    def pose_index(self, name: str) -> int:
+        """Returns the index of a pose by name, -1 if it isn't in the file."""
+        for i, pose in enumerate(self.poses):
+            if self.string(pose['name']) == name:
+                return i
+        return -1
+
+    def pose_bones(self, pose: int) -> np.ndarray:
+        """Returns the bone records of a pose."""
+        record = self.poses[pose]
+        return self.bones[record['bone_start']:record['bone_start'] + record['bone_count']]
+
+    def bone_samples(self, bone: int) -> np.ndarray:
+        """Returns the (samples, 10) delta transforms of a bone record."""
+        record = self.bones[bone]
+        return self.samples[record['sample_start']:record['sample_start'] + record['sample_count']]
+
+    def influences(self, values: np.ndarray) -> np.ndarray:
+        """Returns normalized pose influences for one (inputs,) or many (count, inputs) sets of input values."""
+        values = np.atleast_2d(values)
+        if not len(self.terms):
+            return np.zeros((len(values), len(self.poses)))
+
+        terms = values[:, self.terms['input']] * self.terms['scale'] + self.terms['offset']
+        # A sentinel column closes the term range of the last pose, so trailing poses without terms can't cut it short
+        terms = np.hstack([terms, np.full((len(values), 1), np.inf)])
+        influences = np.minimum.reduceat(terms, self.poses['term_start'].astype(np.intp), axis=1)
+        # Poses without inputs never trigger
+        influences[:, self.poses['term_count'] == 0] = 0.0
+        return np.clip(influences, 0.0, 1.0)
+
+def load(path: str) -> BakedPoses:
+    """Memory maps a baked file. Raises ValueError if it isn't one this reader understands."""
+    data = np.memmap(path, dtype=np.uint8, mode='r')
+    if len(data) < HEADER.itemsize:
+        raise ValueError('Not a baked Action Poser file: %s' % path)
+
+    header = data[:HEADER.itemsize].view(HEADER)[0]
+    if header['magic'] != MAGIC:
+        raise ValueError('Not a baked Action Poser file: %s' % path)
+    if header['version'] != VERSION:
+        raise ValueError('Unsupported baked file version %d: %s' % (header['version'], path))
+
+    sections = {}
+    for name in SECTIONS:
+        offset = int(header[name + '_offset'])
+        count = int(header[name + '_count'])
+        dtype = DTYPES[name]
+        size = count * dtype.itemsize * SHAPES.get(name, 1)
+        array = data[offset:offset + size].view(dtype)
+        if name in SHAPES:
+            array = array.reshape(count, SHAPES[name])
+        sections[name] = array
+
+    return BakedPoses(sections)
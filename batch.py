@@ -0,0 +1,173 @@
+"""Headless batch builder for Action Poser rigs.
+
+Runs the Action Poser build on many .blend files, each one in its own background Blender process.
+
+    blender -b --python batch.py -- --files a.blend b.blend --armatures RIG --jobs 8 --report report.json
+
+Every file is opened, the listed armatures (or every armature with poses when none are given) are built
+with armature.ap_execute and the file is saved. A JSON report with per-file timings and errors is written at the end.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+ADDON_DIR = os.path.dirname(os.path.abspath(__file__))
+ADDON = os.path.basename(ADDON_DIR)
+RESULT_MARKER = 'AP-BATCH-RESULT:'
+
+
+def parse_args(argv: list) -> argparse.Namespace:
+    """Parses the arguments given after Blender's -- separator."""
+    if '--' in argv:
+        argv = argv[argv.index('--') + 1:]
+    else:
+        argv = []
+
+    parser = argparse.ArgumentParser(prog='batch.py', description='Rebuild Action Poser rigs in many .blend files.')
+    parser.add_argument('--files', nargs='+', default=[], help='.blend files to process')
+    parser.add_argument('--file-list', default='', help='Text file with one .blend path per line')
+    parser.add_argument('--armatures', nargs='*', default=[], help='Armature object names to build. Defaults to every armature with poses')
+    parser.add_argument('--jobs', type=int, default=os.cpu_count() or 1, help='Number of Blender processes to run at once')
+    parser.add_argument('--incremental', action='store_true', help='Only rebuild poses whose settings changed')
+    parser.add_argument('--no-save', action='store_true', help='Build without saving the files')
+    parser.add_argument('--report', default='ap_batch_report.json', help='Where to write the JSON report')
+    parser.add_argument('--blender', default='', help='Blender executable used for the workers')
+    parser.add_argument('--timeout', type=float, default=0, help='Seconds before a worker is killed. 0 disables the timeout')
+    parser.add_argument('--worker', action='store_true', help=argparse.SUPPRESS)
+
+    return parser.parse_args(argv)
+
+
+def enable_addon() -> None:
+    """Makes the add-on importable from this folder and registers it."""
+    import addon_utils
+
+    sys.path.insert(0, os.path.dirname(ADDON_DIR))
+    addon_utils.enable(ADDON, default_set=False)
+
+
+def build_armature(obj) -> dict:
+    """Builds all poses on one armature object and returns its result entry."""
+    import bpy
+
+    result = {'armature': obj.name, 'poses': len(obj.data.ap_poses), 'time': 0.0, 'error': ''}
+    start = time.perf_counter()
+
+    try:
+        if bpy.context.mode != 'OBJECT':
+            bpy.ops.object.mode_set(mode='OBJECT')
+        bpy.context.view_layer.objects.active = obj
+        bpy.ops.object.mode_set(mode='POSE')
+        if obj.data.ap_poses:
+            bpy.ops.armature.ap_execute(incremental=ARGS.incremental)
+        bpy.ops.object.mode_set(mode='OBJECT')
+    except Exception as error:
+        result['error'] = str(error)
+
+    result['time'] = time.perf_counter() - start
+    return result
+
+
+def run_worker() -> None:
+    """Builds the armatures in the currently open file. Runs inside a worker process."""
+    import bpy
+
+    start = time.perf_counter()
+    report = {'file': bpy.data.filepath, 'armatures': [], 'time': 0.0, 'error': ''}
+
+    try:
+        enable_addon()
+
+        if ARGS.armatures:
+            objects = []
+            for name in ARGS.armatures:
+                obj = bpy.data.objects.get(name)
+                if obj and obj.type == 'ARMATURE':
+                    objects.append(obj)
+                else:
+                    report['armatures'].append({'armature': name, 'poses': 0, 'time': 0.0, 'error': 'Armature not found'})
+        else:
+            objects = [obj for obj in bpy.context.view_layer.objects if obj.type == 'ARMATURE' and obj.data.ap_poses]
+
+        for obj in objects:
+            report['armatures'].append(build_armature(obj))
+
+        if not ARGS.no_save:
+            bpy.ops.wm.save_mainfile()
+    except Exception as error:
+        report['error'] = str(error)
+
+    report['time'] = time.perf_counter() - start
+    print(RESULT_MARKER + json.dumps(report), flush=True)
+
+
+def process_file(path: str) -> dict:
+    """Starts a background Blender process for one file and collects its report."""
+    command = [ARGS.blender, '-b', '--factory-startup', path, '--python', os.path.abspath(__file__), '--', '--worker']
+    if ARGS.armatures:
+        command += ['--armatures'] + ARGS.armatures
+    if ARGS.incremental:
+        command.append('--incremental')
+    if ARGS.no_save:
+        command.append('--no-save')
+
+    start = time.perf_counter()
+    report = {'file': path, 'armatures': [], 'time': 0.0, 'error': ''}
+
+    try:
+        process = subprocess.run(command, capture_output=True, text=True, timeout=ARGS.timeout or None)
+    except subprocess.TimeoutExpired:
+        report['error'] = 'Timed out after %s seconds' %(ARGS.timeout)
+    else:
+        for line in process.stdout.splitlines():
+            if line.startswith(RESULT_MARKER):
+                report = json.loads(line[len(RESULT_MARKER):])
+                break
+        else:
+            report['error'] = 'Worker exited with code %d: %s' %(process.returncode, process.stderr.strip()[-2000:])
+
+    report['wall_time'] = time.perf_counter() - start
+    return report
+
+
+def run() -> None:
+    """Distributes the files over the worker pool and writes the report."""
+    import bpy
+
+    files = list(ARGS.files)
+    if ARGS.file_list:
+        with open(ARGS.file_list) as file:
+            files += [line.strip() for line in file if line.strip()]
+    if not ARGS.blender:
+        ARGS.blender = bpy.app.binary_path
+
+    start = time.perf_counter()
+    # The pool only waits on subprocesses, every build happens in its own Blender process
+    with ThreadPoolExecutor(max_workers=max(1, ARGS.jobs)) as pool:
+        reports = list(pool.map(process_file, files))
+
+    failed = [report['file'] for report in reports if report['error'] or any(a['error'] for a in report['armatures'])]
+    summary = {
+        'files': len(files),
+        'failed': failed,
+        'jobs': ARGS.jobs,
+        'time': time.perf_counter() - start,
+        'results': reports,
+    }
+
+    with open(ARGS.report, 'w') as file:
+        json.dump(summary, file, indent=2)
+
+    print('Action Poser batch: %d files, %d failed, %.1fs. Report: %s' %(len(files), len(failed), summary['time'], ARGS.report))
+
+
+if __name__ == '__main__':
+    ARGS = parse_args(sys.argv)
+    if ARGS.worker:
+        run_worker()
+    else:
+        run()
@@ -0,0 +1,265 @@
+"""Benchmark suite for Action Poser.
+
+Generates a synthetic rig and times the hot paths of the add-on.
+
+    blender -b --factory-startup --python benchmark.py -- --bones 1500 --poses 400 --combos 100 --output bench.json
+
+The rig has N bones, M poses driven by a handful of driver bones, K combo poses built from random pose pairs
+and one action per pose with a configurable number of keys. Build, incremental build, purge, Edit Action enter/exit
+and per-frame depsgraph evaluation are timed and written as JSON, so results can be compared build over build.
+Playback is also timed with the rig rebuilt in Handler mode, comparing the driver build against the runtime handler.
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from batch import enable_addon
+
+CHANNELS = ['LOC_X', 'LOC_Y', 'LOC_Z', 'ROT_X', 'ROT_Y', 'ROT_Z']
+
+
+def parse_args(argv: list) -> argparse.Namespace:
+    """Parses the arguments given after Blender's -- separator."""
+    if '--' in argv:
+        argv = argv[argv.index('--') + 1:]
+    else:
+        argv = []
+
+    parser = argparse.ArgumentParser(prog='benchmark.py', description='Benchmark Action Poser on a synthetic rig.')
+    parser.add_argument('--bones', type=int, default=500, help='Number of deforming bones')
+    parser.add_argument('--poses', type=int, default=100, help='Number of regular poses')
+    parser.add_argument('--combos', type=int, default=20, help='Number of combo poses')
+    parser.add_argument('--bones-per-pose', type=int, default=20, help='Bones keyed and constrained by each pose')
+    parser.add_argument('--keys', type=int, default=2, help='Keyframes per F-Curve')
+    parser.add_argument('--drivers', type=int, default=8, help='Number of driver bones')
+    parser.add_argument('--frames', type=int, default=50, help='Frames evaluated for the playback timing')
+    parser.add_argument('--repeat', type=int, default=3, help='Repetitions of every measurement')
+    parser.add_argument('--driver-mode', default='BONE', help='Action Poser driver build mode')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default='ap_benchmark.json', help='Where to write the JSON results')
+
+    return parser.parse_args(argv)
+
+
+def generate_rig(name: str, bones: int, poses: int, combos: int, bones_per_pose: int, keys: int, drivers: int, seed: int=0):
+    """Creates an armature object with a synthetic Action Poser setup and makes it active in pose mode."""
+    import bpy
+
+    rng = random.Random(seed)
+
+    armature = bpy.data.armatures.new(name)
+    obj = bpy.data.objects.new(name, armature)
+    bpy.context.scene.collection.objects.link(obj)
+    bpy.context.view_layer.objects.active = obj
+
+    # Bones
+    bpy.ops.object.mode_set(mode='EDIT')
+    driver_names = []
+    for i in range(drivers):
+        edit_bone = armature.edit_bones.new('DRV-%03d' % i)
+        edit_bone.head = (i * 0.5, -2.0, 0.0)
+        edit_bone.tail = (i * 0.5, -2.0, 0.4)
+        driver_names.append(edit_bone.name)
+    bone_names = []
+    for i in range(bones):
+        edit_bone = armature.edit_bones.new('DEF-%05d' % i)
+        edit_bone.head = ((i % 50) * 0.1, 0.0, (i // 50) * 0.1)
+        edit_bone.tail = ((i % 50) * 0.1, 0.0, (i // 50) * 0.1 + 0.08)
+        bone_names.append(edit_bone.name)
+    bpy.ops.object.mode_set(mode='POSE')
+
+    for pose_bone in obj.pose.bones:
+        pose_bone.rotation_mode = 'XYZ'
+
+    # Poses with actions
+    frames = [float(frame) for frame in range(keys)] if keys > 1 else [10.0]
+    for i in range(poses):
+        pose = armature.ap_poses.add()
+        pose.name = 'Pose-%04d' % i
+        pose.target = obj
+        pose.bone = rng.choice(driver_names)
+        pose.channel = rng.choice(CHANNELS)
+        pose.transform_min = 0.0
+        pose.transform_max = 90.0 if 'ROT' in pose.channel else 1.0
+        pose.start_frame = 0
+        pose.end_frame = int(frames[-1])
+        pose.action = generate_action('AP-' + pose.name, rng.sample(bone_names, min(bones_per_pose, bones)), frames, rng)
+        for fcurve_bone in {group.name for group in pose.action.groups}:
+            pose.bones.add().bone = fcurve_bone
+
+    for i in range(combos):
+        pose = armature.ap_poses.add()
+        pose.name = 'Combo-%04d' % i
+        pose.type = 'COMBO'
+        pose_a, pose_b = rng.sample(range(poses), 2)
+        pose.corr_pose_A = armature.ap_poses[pose_a].name
+        pose.corr_pose_B = armature.ap_poses[pose_b].name
+        pose.start_frame = 0
+        pose.end_frame = int(frames[-1])
+        pose.action = generate_action('AC-' + pose.name, rng.sample(bone_names, min(bones_per_pose, bones)), frames, rng)
+        for fcurve_bone in {group.name for group in pose.action.groups}:
+            pose.bones.add().bone = fcurve_bone
+
+    armature.ap_poses_index = 0
+
+    return obj
+
+
+def generate_action(name: str, bone_names: list, frames: list, rng: random.Random):
+    """Creates an action keying location and rotation of the given bones."""
+    import bpy
+
+    action = bpy.data.actions.new(name)
+    action.use_fake_user = True
+
+    for bone_name in bone_names:
+        for prop in ('location', 'rotation_euler'):
+            for index in range(3):
+                fcurve = action.fcurves.new('pose.bones["%s"].%s' % (bone_name, prop), index=index, action_group=bone_name)
+                fcurve.keyframe_points.add(len(frames))
+                co = []
+                for j, frame in enumerate(frames):
+                    co += [frame, 0.0 if j == 0 else rng.uniform(-0.5, 0.5)]
+                fcurve.keyframe_points.foreach_set('co', co)
+                fcurve.update()
+
+    return action
+
+
+def animate_drivers(obj, frames: int) -> None:
+    """Keys the driver bones so that every pose goes through its range during playback."""
+    import bpy
+
+    scene = bpy.context.scene
+    scene.frame_start = 1
+    scene.frame_end = frames
+
+    for pose_bone in obj.pose.bones:
+        if not pose_bone.name.startswith('DRV-'):
+            continue
+        for frame, value in ((1, 0.0), (frames, 1.0)):
+            pose_bone.location = (value, value, value)
+            pose_bone.rotation_euler = (value * 1.6, value * 1.6, value * 1.6)
+            pose_bone.keyframe_insert('location', frame=frame)
+            pose_bone.keyframe_insert('rotation_euler', frame=frame)
+
+
+def measure(func, repeat: int) -> dict:
+    """Runs func repeat times and returns timing statistics in seconds."""
+    times = []
+    for i in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+
+    return {'min': min(times), 'mean': statistics.mean(times), 'max': max(times), 'runs': repeat}
+
+
+def count_built(obj) -> dict:
+    """Counts the constraints and drivers that the build created."""
+    constraints = sum(len(entry.bones) for entry in obj.data.ap_manifest)
+    drivers = len(obj.animation_data.drivers) if obj.animation_data else 0
+    drivers += len(obj.data.animation_data.drivers) if obj.data.animation_data else 0
+
+    return {'constraints': constraints, 'drivers': drivers}
+
+
+def time_playback(frames: int) -> dict:
+    """Times depsgraph evaluation of every frame in the scene range."""
+    import bpy
+
+    scene = bpy.context.scene
+    times = []
+    for frame in range(1, frames + 1):
+        start = time.perf_counter()
+        scene.frame_set(frame)
+        # Handler mode writes the constraints after the frame change, which takes one more evaluation to show
+        bpy.context.view_layer.update()
+        times.append(time.perf_counter() - start)
+
+    return {'mean': statistics.mean(times), 'median': statistics.median(times), 'max': max(times), 'fps': 1.0 / statistics.mean(times)}
+
+
+def compare_runtime(args: argparse.Namespace) -> dict:
+    """Times playback of the same rig built with drivers and in Handler mode, then restores the driver build."""
+    import bpy
+
+    prefs = bpy.context.scene.ap_preferences
+    results = {}
+
+    for mode in ('BONE', 'HANDLER'):
+        prefs.driver_mode = mode
+        start = time.perf_counter()
+        bpy.ops.armature.ap_execute()
+        results[mode.lower()] = {'build': time.perf_counter() - start, 'playback': time_playback(args.frames)}
+
+    results['speedup'] = results['bone']['playback']['mean'] / results['handler']['playback']['mean']
+
+    prefs.driver_mode = args.driver_mode
+    bpy.ops.armature.ap_execute()
+
+    return results
+
+
+def run(args: argparse.Namespace) -> dict:
+    """Generates the rig, runs every benchmark and returns the results."""
+    import bpy
+
+    enable_addon()
+    bpy.context.scene.ap_preferences.driver_mode = args.driver_mode
+
+    start = time.perf_counter()
+    obj = generate_rig('AP-Benchmark', args.bones, args.poses, args.combos, args.bones_per_pose, args.keys, args.drivers, args.seed)
+    generate_time = time.perf_counter() - start
+    animate_drivers(obj, args.frames)
+
+    results = {
+        'blender': bpy.app.version_string,
+        'parameters': vars(args),
+        'generate': generate_time,
+    }
+
+    results['build'] = measure(lambda: bpy.ops.armature.ap_execute(), args.repeat)
+    results['counts'] = count_built(obj)
+    results['build_incremental'] = measure(lambda: bpy.ops.armature.ap_execute(incremental=True), args.repeat)
+
+    enter = []
+    exit = []
+    for i in range(args.repeat):
+        start = time.perf_counter()
+        bpy.ops.armature.ap_action_edit(idx=obj.data.ap_poses_index)
+        enter.append(time.perf_counter() - start)
+        start = time.perf_counter()
+        bpy.ops.armature.ap_action_edit(idx=obj.data.ap_poses_index)
+        exit.append(time.perf_counter() - start)
+    results['action_edit_enter'] = {'min': min(enter), 'mean': statistics.mean(enter), 'max': max(enter), 'runs': args.repeat}
+    results['action_edit_exit'] = {'min': min(exit), 'mean': statistics.mean(exit), 'max': max(exit), 'runs': args.repeat}
+
+    results['playback'] = time_playback(args.frames)
+    results['runtime_comparison'] = compare_runtime(args)
+
+    def purge_and_build():
+        bpy.ops.armature.ap_purge()
+        bpy.ops.armature.ap_execute()
+    results['purge_and_build'] = measure(purge_and_build, args.repeat)
+
+    start = time.perf_counter()
+    bpy.ops.armature.ap_purge()
+    results['purge'] = time.perf_counter() - start
+
+    return results
+
+
+if __name__ == '__main__':
+    ARGS = parse_args(sys.argv)
+    RESULTS = run(ARGS)
+
+    with open(ARGS.output, 'w') as file:
+        json.dump(RESULTS, file, indent=2)
+
+    print(json.dumps(RESULTS, indent=2))
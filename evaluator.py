@@ -0,0 +1,355 @@
+"""Pure NumPy reference evaluator for Action Poser setups.
+
+export_setup() turns an armature's pose definitions and pose actions into plain arrays. From there on
+nothing touches Blender: evaluate_influences() and evaluate_transforms() compute pose influences and
+the resulting local bone matrices for a whole batch of driver input values at once.
+
+Driven bones are assumed to sit at rest when the constraints are applied, which is how correctives are set up.
+Influence blending of a constraint is approximated by blending its action transform towards identity.
+
+Only export_setup() and pose_terms() need the add-on and Blender, they import it when called. Everything else
+works with NumPy alone, so the file can be copied next to a saved setup and imported on its own.
+"""
+import json
+
+import numpy as np
+
+EULER_ORDERS = ('XYZ', 'XZY', 'YXZ', 'YZX', 'ZXY', 'ZYX')
+
+REST = {
+    'location': (0.0, 0.0, 0.0),
+    'rotation_quaternion': (1.0, 0.0, 0.0, 0.0),
+    'scale': (1.0, 1.0, 1.0),
+}
+
+def input_name(spec: dict) -> str:
+    """Returns the readable name of a driver input, without its range."""
+    if 'data_path' in spec:
+        return '%s:%s' % (spec['target'], spec['data_path'])
+    return '%s:%s:%s:%s:%s' % (spec['target'], spec['bone_target'], spec['transform_type'], spec['transform_space'], spec.get('rot_mode', ''))
+
+def export_setup(obj, samples: int=4) -> dict:
+    """Exports the buildable poses of an armature object into a setup for the evaluator.
+        Pose actions are sampled samples times per frame over each pose's frame range.
+    """
+    from . utilities import is_valid_pose
+
+    ap_poses = obj.data.ap_poses
+    cache = {}
+    inputs = {}
+    poses = []
+
+    for pose in ap_poses:
+        if not (is_valid_pose(pose) and pose.build):
+            continue
+
+        terms = pose_terms(pose, inputs, cache)
+        frame_count = max(2, (pose.end_frame - pose.start_frame) * samples + 1)
+        frames = np.linspace(pose.start_frame, pose.end_frame, frame_count)
+        bones = []
+        for ap_bone in pose.bones:
+            pose_bone = obj.pose.bones.get(ap_bone.bone)
+            if not pose_bone:
+                continue
+            channels = sample_bone_channels(pose.action, pose_bone, frames)
+            bones.append(dict(name=ap_bone.bone, influence=ap_bone.influence, **channels))
+
+        poses.append({
+            'name': pose.name,
+            'type': pose.type,
+            'mix': pose.mix,
+            'combo': [pose.corr_pose_A, pose.corr_pose_B] if pose.type == 'COMBO' else [],
+            'terms': terms,
+            'bones': bones,
+        })
+
+    return {'inputs': list(inputs.values()), 'poses': poses}
+
+def pose_terms(pose, inputs: dict, cache: dict) -> list:
+    """Returns the (input index, scale, offset) terms of a pose, adding any new inputs to inputs by name."""
+    from . expressions import fold_range
+    from . utilities import collect_inputs
+
+    terms = []
+    for spec in collect_inputs(pose, cache).values():
+        spec = dict(spec, target=spec['target'].name if spec['target'] else '')
+        name = input_name(spec)
+        if name not in inputs:
+            inputs[name] = {key: value for key, value in spec.items() if key not in ('transform_min', 'transform_max')}
+            inputs[name]['name'] = name
+            inputs[name]['index'] = len(inputs) - 1
+        rotation = 'ROT' in spec.get('transform_type', '')
+        scale, offset = fold_range(spec['transform_min'], spec['transform_max'], rotation)
+        terms.append((inputs[name]['index'], scale, offset))
+
+    return terms
+
+def sample_bone_channels(action, pose_bone, frames: np.ndarray) -> dict:
+    """Samples location, rotation and scale of one bone from an action. Returns arrays of shape (frames, size)."""
+    channels = {channel: np.tile(np.array(rest), (len(frames), 1)) for channel, rest in REST.items()}
+    euler = np.zeros((len(frames), 3))
+    has_euler = False
+    prefix = 'pose.bones["%s"].' % pose_bone.name
+
+    if action:
+        for fcurve in action.fcurves:
+            if not fcurve.data_path.startswith(prefix):
+                continue
+            channel = fcurve.data_path[len(prefix):]
+            values = np.array([fcurve.evaluate(frame) for frame in frames])
+            if channel == 'rotation_euler' and fcurve.array_index < 3:
+                euler[:, fcurve.array_index] = values
+                has_euler = True
+            elif channel in channels and fcurve.array_index < channels[channel].shape[1]:
+                channels[channel][:, fcurve.array_index] = values
+
+    # The bone's rotation mode decides which rotation channels the constraint reads
+    if pose_bone.rotation_mode not in ('QUATERNION', 'AXIS_ANGLE'):
+        channels['rotation_quaternion'] = euler_to_quaternion(euler, pose_bone.rotation_mode) if has_euler else channels['rotation_quaternion']
+
+    return channels
+
+def evaluate_influences(setup: dict, inputs) -> np.ndarray:
+    """Returns pose influences of shape (samples, poses) for a batch of raw driver input values.
+        inputs is an array of shape (samples, inputs) in setup order, or a dict of input name to values.
+        Rotation inputs are in radians, as the driver variables see them.
+    """
+    values = input_array(setup, inputs)
+    index, scale, offset, starts = pack_terms(setup)
+    if not len(index):
+        return np.zeros((values.shape[0], len(setup['poses'])))
+
+    # Combos trigger on the smallest of their normalized inputs
+    terms = values[:, index] * scale + offset
+    return np.clip(np.minimum.reduceat(terms, starts, axis=1), 0.0, 1.0)
+
+def pack_terms(setup: dict) -> tuple:
+    """Flattens the terms of all poses into arrays so every influence is evaluated in one go. Cached on the setup."""
+    if 'packed' not in setup:
+        index, scale, offset, starts = [], [], [], []
+        for pose in setup['poses']:
+            starts.append(len(index))
+            # A pose without inputs never triggers
+            for term in pose['terms'] or [(0, 0.0, 0.0)]:
+                index.append(term[0])
+                scale.append(term[1])
+                offset.append(term[2])
+        if not setup['inputs']:
+            index = []
+        setup['packed'] = (np.array(index, dtype=int), np.array(scale), np.array(offset), np.array(starts, dtype=int))
+
+    return setup['packed']
+
+def evaluate_transforms(setup: dict, inputs) -> dict:
+    """Returns the local matrices of all driven bones, shape (samples, 4, 4) per bone name."""
+    influences = evaluate_influences(setup, inputs)
+    count = influences.shape[0]
+    matrices = {}
+
+    # Constraints stack on each bone in pose order, just like the build creates them
+    for i, pose in enumerate(setup['poses']):
+        for bone in pose['bones']:
+            channels = interpolate_channels(bone, influences[:, i])
+            action_matrix = compose_matrices(*blend_channels(channels, bone['influence']))
+            matrix = matrices.get(bone['name'])
+            if matrix is None:
+                matrix = np.tile(np.eye(4), (count, 1, 1))
+            if pose['mix'].startswith('BEFORE'):
+                matrices[bone['name']] = action_matrix @ matrix
+            else:
+                matrices[bone['name']] = matrix @ action_matrix
+
+    return matrices
+
+def input_array(setup: dict, inputs) -> np.ndarray:
+    """Converts inputs given as a dict of name to values into a (samples, inputs) array."""
+    if isinstance(inputs, dict):
+        count = len(next(iter(inputs.values()))) if inputs else 1
+        values = np.zeros((count, len(setup['inputs'])))
+        for i, spec in enumerate(setup['inputs']):
+            if spec['name'] in inputs:
+                values[:, i] = inputs[spec['name']]
+        return values
+
+    return np.atleast_2d(np.asarray(inputs, dtype=float))
+
+def interpolate_channels(bone: dict, eval_time: np.ndarray) -> dict:
+    """Reads the sampled bone channels at the given eval times (0..1)."""
+    channels = {}
+    for channel in REST.keys():
+        samples = bone[channel]
+        position = eval_time * (len(samples) - 1)
+        low = np.floor(position).astype(int).clip(0, len(samples) - 1)
+        high = np.minimum(low + 1, len(samples) - 1)
+        factor = (position - low)[:, None]
+        channels[channel] = samples[low] * (1.0 - factor) + samples[high] * factor
+    return channels
+
+def blend_channels(channels: dict, influence: float) -> tuple:
+    """Blends channels towards the identity transform by the constraint influence."""
+    location = channels['location'] * influence
+    quaternion = channels['rotation_quaternion'] * influence
+    quaternion[:, 0] += 1.0 - influence
+    quaternion /= np.linalg.norm(quaternion, axis=1, keepdims=True)
+    scale = 1.0 + (channels['scale'] - 1.0) * influence
+    return location, quaternion, scale
+
+def compose_matrices(location: np.ndarray, quaternion: np.ndarray, scale: np.ndarray) -> np.ndarray:
+    """Builds (samples, 4, 4) matrices from location, normalized quaternion and scale arrays."""
+    w, x, y, z = quaternion.T
+    matrix = np.zeros((len(location), 4, 4))
+    matrix[:, 0, 0] = 1 - 2 * (y * y + z * z)
+    matrix[:, 0, 1] = 2 * (x * y - z * w)
+    matrix[:, 0, 2] = 2 * (x * z + y * w)
+    matrix[:, 1, 0] = 2 * (x * y + z * w)
+    matrix[:, 1, 1] = 1 - 2 * (x * x + z * z)
+    matrix[:, 1, 2] = 2 * (y * z - x * w)
+    matrix[:, 2, 0] = 2 * (x * z - y * w)
+    matrix[:, 2, 1] = 2 * (y * z + x * w)
+    matrix[:, 2, 2] = 1 - 2 * (x * x + y * y)
+    matrix[:, :3, :3] *= scale[:, None, :]
+    matrix[:, :3, 3] = location
+    matrix[:, 3, 3] = 1.0
+    return matrix
+
+def euler_to_quaternion(euler: np.ndarray, order: str='XYZ') -> np.ndarray:
+    """Converts (samples, 3) euler angles in Blender's rotation order to (samples, 4) quaternions."""
+    half = euler * 0.5
+    axes = {}
+    for i, axis in enumerate('XYZ'):
+        quaternion = np.zeros((len(euler), 4))
+        quaternion[:, 0] = np.cos(half[:, i])
+        quaternion[:, i + 1] = np.sin(half[:, i])
+        axes[axis] = quaternion
+
+    # The first axis in the order is applied first
+    result = axes[order[0]]
+    for axis in order[1:]:
+        result = multiply_quaternions(axes[axis], result)
+    return result
+
+def multiply_quaternions(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Hamilton product of two (samples, 4) quaternion arrays."""
+    aw, ax, ay, az = a.T
+    bw, bx, by, bz = b.T
+    return np.stack([
+        aw * bw - ax * bx - ay * by - az * bz,
+        aw * bx + ax * bw + ay * bz - az * by,
+        aw * by - ax * bz + ay * bw + az * bx,
+        aw * bz + ax * by - ay * bx + az * bw,
+    ], axis=1)
+
+def matrix_channels(matrices: np.ndarray, channels: list, rot_modes: list) -> np.ndarray:
+    """Reads one driver channel per matrix, the way a transform channel driver variable does.
+        matrices has shape (count, 4, 4); channels and rot_modes hold one entry per matrix.
+        AUTO depends on the target bone, callers resolve it with auto_rot_mode(). Unresolved it reads as XYZ.
+    """
+    matrices = np.asarray(matrices, dtype=float)
+    values = np.zeros(len(matrices))
+    scale = np.linalg.norm(matrices[:, :3, :3], axis=1)
+    rotation = matrices[:, :3, :3] / np.where(scale > 0.0, scale, 1.0)[:, None, :]
+    eulers = {}
+    swings = {}
+    quaternions = None
+
+    for i, (channel, rot_mode) in enumerate(zip(channels, rot_modes)):
+        kind, axis = channel.split('_')
+        if kind == 'LOC':
+            values[i] = matrices[i, 'XYZ'.index(axis), 3]
+        elif kind == 'SCALE':
+            values[i] = scale[i].mean() if axis == 'AVG' else scale[i, 'XYZ'.index(axis)]
+        elif rot_mode.startswith('SWING_TWIST'):
+            if quaternions is None:
+                quaternions = matrix_to_quaternion(rotation)
+            if rot_mode not in swings:
+                swings[rot_mode] = swing_twist(quaternions, rot_mode[-1])
+            values[i] = swings[rot_mode][i, 'WXYZ'.index(axis)]
+        elif rot_mode == 'QUATERNION' or axis == 'W':
+            if quaternions is None:
+                quaternions = matrix_to_quaternion(rotation)
+            values[i] = quaternions[i, 'WXYZ'.index(axis)]
+        else:
+            order = rot_mode if rot_mode in EULER_ORDERS else 'XYZ'
+            if order not in eulers:
+                eulers[order] = matrix_to_euler(rotation, order)
+            values[i] = eulers[order][i, 'XYZ'.index(axis)]
+
+    return values
+
+def auto_rot_mode(bone_rotation_mode: str) -> str:
+    """Returns the Euler order an AUTO driver variable reads a bone in: its own order, XYZ for quaternion
+        and axis angle bones.
+    """
+    return bone_rotation_mode if bone_rotation_mode in EULER_ORDERS else 'XYZ'
+
+def swing_twist(quaternion: np.ndarray, axis: str='Y') -> np.ndarray:
+    """Splits (count, 4) quaternions into a swing followed by a twist around the axis, like the Swing and Twist
+        driver modes. Returns (count, 4) WXYZ channels: W is the swing angle, the others the swing's pseudo-angles,
+        except the twist axis, which holds the twist angle.
+    """
+    index = 'XYZ'.index(axis) + 1
+    quaternion = np.where(quaternion[:, :1] < 0.0, -quaternion, quaternion)
+    half_twist = np.arctan2(quaternion[:, index], quaternion[:, 0])
+
+    inverse_twist = np.zeros_like(quaternion)
+    inverse_twist[:, 0] = np.cos(half_twist)
+    inverse_twist[:, index] = -np.sin(half_twist)
+    swing = multiply_quaternions(quaternion, inverse_twist)
+
+    channels = np.empty_like(swing)
+    channels[:, 0] = 2.0 * np.arccos(np.clip(swing[:, 0], -1.0, 1.0))
+    channels[:, 1:] = 2.0 * np.arcsin(np.clip(swing[:, 1:], -1.0, 1.0))
+    channels[:, index] = 2.0 * half_twist
+    return channels
+
+def matrix_to_euler(rotation: np.ndarray, order: str='XYZ') -> np.ndarray:
+    """Converts (count, 3, 3) rotation matrices to euler angles in Blender's rotation order."""
+    a, b, c = ('XYZ'.index(axis) for axis in order)
+    sign = 1.0 if order in ('XYZ', 'YZX', 'ZXY') else -1.0
+
+    euler = np.zeros((len(rotation), 3))
+    euler[:, b] = np.arcsin(np.clip(-sign * rotation[:, c, a], -1.0, 1.0))
+    euler[:, a] = np.arctan2(sign * rotation[:, c, b], rotation[:, c, c])
+    euler[:, c] = np.arctan2(sign * rotation[:, b, a], rotation[:, a, a])
+    return euler
+
+def matrix_to_quaternion(rotation: np.ndarray) -> np.ndarray:
+    """Converts (count, 3, 3) rotation matrices to (count, 4) quaternions with a positive W."""
+    m = rotation
+    quaternion = np.stack([
+        1.0 + m[:, 0, 0] + m[:, 1, 1] + m[:, 2, 2],
+        1.0 + m[:, 0, 0] - m[:, 1, 1] - m[:, 2, 2],
+        1.0 - m[:, 0, 0] + m[:, 1, 1] - m[:, 2, 2],
+        1.0 - m[:, 0, 0] - m[:, 1, 1] + m[:, 2, 2],
+    ], axis=1)
+    quaternion = np.sqrt(np.maximum(quaternion, 0.0)) * 0.5
+    quaternion[:, 1] = np.copysign(quaternion[:, 1], m[:, 2, 1] - m[:, 1, 2])
+    quaternion[:, 2] = np.copysign(quaternion[:, 2], m[:, 0, 2] - m[:, 2, 0])
+    quaternion[:, 3] = np.copysign(quaternion[:, 3], m[:, 1, 0] - m[:, 0, 1])
+    return quaternion
+
+def save_setup(setup: dict, path: str) -> None:
+    """Writes a setup to a .npz file so it can be evaluated outside Blender."""
+    arrays = {}
+    poses = []
+    for i, pose in enumerate(setup['poses']):
+        bones = []
+        for j, bone in enumerate(pose['bones']):
+            for channel in REST.keys():
+                arrays['%d_%d_%s' % (i, j, channel)] = bone[channel]
+            bones.append({'name': bone['name'], 'influence': bone['influence']})
+        poses.append(dict(pose, bones=bones))
+
+    meta = json.dumps({'inputs': setup['inputs'], 'poses': poses})
+    np.savez_compressed(path, meta=np.frombuffer(meta.encode(), dtype=np.uint8), **arrays)
+
+def load_setup(path: str) -> dict:
+    """Reads a setup written by save_setup."""
+    with np.load(path) as data:
+        setup = json.loads(data['meta'].tobytes().decode())
+        for i, pose in enumerate(setup['poses']):
+            pose['terms'] = [tuple(term) for term in pose['terms']]
+            for j, bone in enumerate(pose['bones']):
+                for channel in REST.keys():
+                    bone[channel] = data['%d_%d_%s' % (i, j, channel)]
+    return setup
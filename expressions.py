@@ -0,0 +1,93 @@
+import ast
+import math
+
+# Functions understood by Blender's simple expression evaluator.
+# Drivers that only use these never have to go through the Python interpreter.
+SIMPLE_FUNCTIONS = {
+    'radians', 'degrees',
+    'abs', 'fabs', 'floor', 'ceil', 'trunc', 'round', 'int',
+    'sin', 'cos', 'tan', 'asin', 'acos', 'atan', 'atan2',
+    'exp', 'log', 'sqrt', 'pow', 'fmod',
+    'min', 'max', 'smoothstep', 'lerp', 'clamp',
+}
+SIMPLE_CONSTANTS = {'pi', 'True', 'False'}
+SIMPLE_NODES = (
+    ast.Expression, ast.BinOp, ast.UnaryOp, ast.BoolOp, ast.Compare, ast.IfExp, ast.Call,
+    ast.Name, ast.Load, ast.Constant,
+    ast.Add, ast.Sub, ast.Mult, ast.Div, ast.Pow, ast.USub, ast.UAdd, ast.Not, ast.And, ast.Or,
+    ast.Eq, ast.NotEq, ast.Lt, ast.LtE, ast.Gt, ast.GtE,
+)
+
+def fold_range(value_min: float, value_max: float, rotation: bool=False) -> tuple:
+    """Returns (scale, offset) so that value * scale + offset maps min..max onto 0..1.
+        Rotation ranges are given in degrees and folded to radians, since that is what the driver variable returns.
+        A zero length range folds to a constant 0.
+    """
+    if rotation:
+        value_min = math.radians(value_min)
+        value_max = math.radians(value_max)
+
+    if value_max == value_min:
+        return 0.0, 0.0
+
+    scale = 1.0 / (value_max - value_min)
+    return scale, -value_min * scale
+
+def format_number(value: float) -> str:
+    """Formats a float without exponent notation."""
+    text = ('%.12f' % value).rstrip('0')
+    if text.endswith('.'):
+        text += '0'
+    if text in ('-0.0', ''):
+        text = '0.0'
+    return text
+
+def compile_term(name: str, scale: float, offset: float) -> str:
+    """Returns the folded linear term for one driver variable."""
+    if scale == 0.0:
+        return format_number(offset)
+
+    term = name
+    if scale != 1.0:
+        term += '*' + format_number(scale)
+    if offset > 0.0:
+        term += ' + ' + format_number(offset)
+    elif offset < 0.0:
+        term += ' - ' + format_number(-offset)
+
+    return term
+
+def compile_expression(terms: list) -> str:
+    """Compiles a list of (name, scale, offset) terms into a driver expression.
+        Multiple terms are combined with min(), which is how combos are triggered.
+    """
+    compiled = [compile_term(name, scale, offset) for name, scale, offset in terms]
+
+    if not compiled:
+        return '0.0'
+    if len(compiled) == 1:
+        return compiled[0]
+    return 'min(' + ', '.join(compiled) + ')'
+
+def is_simple_expression(expression: str, variables: set=None) -> bool:
+    """Checks if the expression can be handled by Blender's simple expression evaluator."""
+    try:
+        tree = ast.parse(expression, mode='eval')
+    except SyntaxError:
+        return False
+
+    for node in ast.walk(tree):
+        if not isinstance(node, SIMPLE_NODES):
+            return False
+        if isinstance(node, ast.Constant) and not isinstance(node.value, (int, float)):
+            return False
+        if isinstance(node, ast.Call):
+            if not isinstance(node.func, ast.Name) or node.func.id not in SIMPLE_FUNCTIONS or node.keywords:
+                return False
+        elif isinstance(node, ast.Name):
+            if node.id in SIMPLE_FUNCTIONS or node.id in SIMPLE_CONSTANTS:
+                continue
+            if variables is not None and node.id not in variables:
+                return False
+
+    return True
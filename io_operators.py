@@ -0,0 +1,102 @@
+import bpy
+from bpy_extras.io_utils import ExportHelper, ImportHelper
+from . evaluator import export_setup
+from . bake import bake_setup, write_baked
+from . library import write_library, import_poses
+
+class DATA_OT_ap_export_baked(bpy.types.Operator, ExportHelper):
+    bl_idname = "armature.ap_export_baked"
+    bl_label = "Export Baked Poses"
+    bl_description = "Bake every buildable pose into a compact binary file for game engine runtimes"
+    bl_options = {"REGISTER"}
+
+    filename_ext = '.apbk'
+    filter_glob: bpy.props.StringProperty(default='*.apbk', options={'HIDDEN'})
+    samples: bpy.props.IntProperty(name='Samples per Frame', default=1, min=1, max=16, description='How many delta transforms are sampled per frame of each pose action')
+
+    @classmethod
+    def poll(cls, context):
+        return context.mode == 'POSE' and context.active_object.data.ap_poses
+
+    def execute(self, context):
+        setup = export_setup(context.active_object, self.samples)
+        size = write_baked(self.filepath, bake_setup(setup))
+
+        self.report({'INFO'}, '%d poses baked to %s (%.1f KB)' %(len(setup['poses']), self.filepath, size / 1024))
+        return {'FINISHED'}
+
+class DATA_OT_ap_export_library(bpy.types.Operator, ExportHelper):
+    bl_idname = "armature.ap_export_library"
+    bl_label = "Export Pose Library"
+    bl_description = "Write the poses to a library file that can be imported into other files"
+    bl_options = {"REGISTER"}
+
+    filename_ext = '.json'
+    filter_glob: bpy.props.StringProperty(default='*.json;*.apl', options={'HIDDEN'})
+    format: bpy.props.EnumProperty(name='Format', description='Library file format', items=(
+                                                                                            ('JSON', 'JSON', 'One pose per line, diffable', 0),
+                                                                                            ('BINARY', 'Binary', 'Compact binary records', 1)), default='JSON')
+    mode : bpy.props.EnumProperty(name='Mode', description='Choose which poses to export', items={('ALL', 'All', 'All', 0), ('ACTIVE', 'Active', 'Active', 1)}, default='ALL')
+
+    @classmethod
+    def poll(cls, context):
+        return context.mode == 'POSE' and context.active_object.data.ap_poses
+
+    def check(self, context):
+        self.filename_ext = '.apl' if self.format == 'BINARY' else '.json'
+        return ExportHelper.check(self, context)
+
+    def execute(self, context):
+        armature = context.active_object.data
+        if self.mode == 'ACTIVE':
+            poses = [armature.ap_poses[armature.ap_poses_index]]
+        else:
+            poses = armature.ap_poses
+
+        count = write_library(self.filepath, context.active_object, poses, self.format == 'BINARY')
+
+        self.report({'INFO'}, '%d poses exported to %s' %(count, self.filepath))
+        return {'FINISHED'}
+
+
+class DATA_OT_ap_import_library(bpy.types.Operator, ImportHelper):
+    bl_idname = "armature.ap_import_library"
+    bl_label = "Import Pose Library"
+    bl_description = "Add the poses of a library file to the active armature"
+    bl_options = {"REGISTER", "UNDO"}
+
+    filter_glob: bpy.props.StringProperty(default='*.json;*.apl', options={'HIDDEN'})
+    replace: bpy.props.BoolProperty(name='Replace Existing', default=False, description='Overwrite poses that have the same name instead of adding them alongside')
+
+    @classmethod
+    def poll(cls, context):
+        return context.mode == 'POSE'
+
+    def execute(self, context):
+        armature = context.active_object.data
+        was_empty = not armature.ap_poses
+
+        try:
+            result = import_poses(context.active_object, self.filepath, self.replace)
+        except (OSError, ValueError) as error:
+            self.report({'ERROR'}, str(error))
+            return {'CANCELLED'}
+
+        # The index is only touched once, so its update doesn't run per pose
+        if was_empty and armature.ap_poses:
+            armature.ap_poses_index = 0
+
+        message = '%d poses added, %d replaced' %(result['added'], result['replaced'])
+        if result['missing']:
+            self.report({'WARNING'}, message + '. Not found: %s' %(', '.join(sorted(result['missing']))))
+        else:
+            self.report({'INFO'}, message)
+        return {'FINISHED'}
+
+classes = [
+    DATA_OT_ap_export_baked,
+    DATA_OT_ap_export_library,
+    DATA_OT_ap_import_library,
+]
+
+register, unregister = bpy.utils.register_classes_factory(classes)
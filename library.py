@@ -0,0 +1,257 @@
+"""Pose libraries: ap_poses streamed to and from files.
+
+Two formats hold the same data. JSON is one pose per line behind a header line, sorted keys, so libraries
+diff cleanly in version control. Binary is length prefixed records behind a header listing the fields.
+Both are written and read one pose at a time, imports check every record before the armature is touched.
+Objects and actions are stored by name.
+"""
+import io
+import json
+import struct
+
+import bpy
+
+from . ui_operators import PROPERTIES
+from . utilities import mark_lists_changed
+
+FORMAT = 'ActionPoser'
+VERSION = 1
+MAGIC = b'APLB'
+
+def pose_to_dict(pose: bpy.types.PropertyGroup) -> dict:
+    """Returns the pose settings as plain data, with objects and actions referenced by name."""
+    data = {}
+    for prop in PROPERTIES:
+        value = getattr(pose, prop)
+        if isinstance(value, bpy.types.ID) or value is None:
+            value = value.name if value else ''
+        data[prop] = value
+    data['bones'] = [[bone.bone, bone.influence] for bone in pose.bones]
+
+    return data
+
+def pose_fields(pose: bpy.types.PropertyGroup) -> list:
+    """Returns (name, RNA type) pairs of the stored pose properties."""
+    return [(prop, pose.bl_rna.properties[prop].type) for prop in PROPERTIES]
+
+def library_header(obj: bpy.types.Object, fields: list=None) -> dict:
+    """Returns the header written before the poses. It names the armature object, since pose targets are objects."""
+    header = {'format': FORMAT, 'version': VERSION, 'armature': obj.name}
+    if fields is not None:
+        header['fields'] = fields
+    return header
+
+def write_library(path: str, obj: bpy.types.Object, poses, binary: bool=False) -> int:
+    """Streams poses of an armature object to a library file. Returns how many were written."""
+    count = 0
+    if binary:
+        ap_poses = obj.data.ap_poses
+        fields = pose_fields(ap_poses[0]) if ap_poses else [(prop, '') for prop in PROPERTIES]
+        with open(path, 'wb') as file:
+            file.write(MAGIC)
+            file.write(pack_blob(json.dumps(library_header(obj, fields)).encode()))
+            for pose in poses:
+                file.write(pack_blob(encode_pose(pose_to_dict(pose), fields)))
+                count += 1
+    else:
+        with open(path, 'w', encoding='utf-8', newline='\n') as file:
+            file.write(json.dumps(library_header(obj)) + '\n')
+            for pose in poses:
+                file.write(json.dumps(pose_to_dict(pose), sort_keys=True) + '\n')
+                count += 1
+
+    return count
+
+def read_library(path: str):
+    """Yields the library header, then one pose dict at a time. Raises ValueError for files that aren't libraries."""
+    with open(path, 'rb') as file:
+        if file.read(len(MAGIC)) == MAGIC:
+            blob = read_blob(file)
+            try:
+                header = json.loads(blob) if blob else None
+            except ValueError:
+                header = None
+            check_header(header, path, binary=True)
+            yield header
+            fields = header['fields']
+            while True:
+                record = read_blob(file)
+                if record is None:
+                    break
+                yield decode_pose(record, fields)
+        else:
+            file.seek(0)
+            lines = (line for line in io.TextIOWrapper(file, encoding='utf-8') if line.strip())
+            try:
+                header = json.loads(next(lines))
+            except (StopIteration, ValueError):
+                header = None
+            check_header(header, path)
+            yield header
+            for line in lines:
+                yield json.loads(line)
+
+def check_header(header: dict, path: str, binary: bool=False) -> None:
+    """Raises ValueError unless the header belongs to a library this version can read.
+        Binary headers also need the (name, type) field list their records are packed with.
+    """
+    if not isinstance(header, dict) or header.get('format') != FORMAT or not isinstance(header.get('version', 0), int):
+        raise ValueError('Not an Action Poser library: %s' % path)
+    if header.get('version', 0) > VERSION:
+        raise ValueError('Library was written by a newer version: %s' % path)
+    if binary:
+        fields = header.get('fields')
+        if not isinstance(fields, list) or not all(isinstance(field, list) and len(field) == 2 and all(isinstance(part, str) for part in field) for field in fields):
+            raise ValueError('Library header has no valid field list: %s' % path)
+
+def check_library(path: str) -> dict:
+    """Streams through a library and checks every record without keeping any. Returns the header.
+        Raises ValueError on the first malformed record, so nothing gets imported from a broken file.
+    """
+    records = read_library(path)
+    header = next(records)
+    count = 0
+    try:
+        for data in records:
+            check_pose(data, count, path)
+            count += 1
+    except (struct.error, UnicodeDecodeError, json.JSONDecodeError) as error:
+        raise ValueError('Corrupt pose record %d in %s: %s' % (count + 1, path, error))
+
+    return header
+
+def check_pose(data: dict, index: int, path: str) -> None:
+    """Raises ValueError unless a record has a pose name and a valid bone list."""
+    bones = data.get('bones', []) if isinstance(data, dict) else None
+    valid = isinstance(data, dict) and isinstance(data.get('name'), str) and isinstance(bones, list)
+    if valid:
+        valid = all(isinstance(bone, list) and len(bone) == 2 and isinstance(bone[0], str) and isinstance(bone[1], (int, float)) for bone in bones)
+    if not valid:
+        raise ValueError('Malformed pose record %d in %s' % (index + 1, path))
+
+def import_poses(obj: bpy.types.Object, path: str, replace: bool=False) -> dict:
+    """Imports the poses of a library into an armature object.
+        The file is streamed twice: every record is checked first, so a malformed one leaves the armature untouched,
+        then the poses are applied one at a time.
+        Poses with an existing name are overwritten when replace is set, otherwise they are added alongside.
+        Targets that pointed at the exported armature are remapped to obj.
+    """
+    ap_poses = obj.data.ap_poses
+    result = {'added': 0, 'replaced': 0, 'missing': set()}
+
+    header = check_library(path)
+    records = read_library(path)
+    next(records)
+    existing = {pose.name: i for i, pose in enumerate(ap_poses)}
+
+    for data in records:
+        if replace and data.get('name') in existing:
+            pose = ap_poses[existing[data['name']]]
+            result['replaced'] += 1
+        else:
+            pose = ap_poses.add()
+            result['added'] += 1
+        if data.get('target') == header.get('armature'):
+            data['target'] = obj.name
+        result['missing'] |= apply_pose(pose, data)
+
+    return result
+
+def apply_pose(pose: bpy.types.PropertyGroup, data: dict) -> set:
+    """Sets a pose from plain data. Returns the names of objects and actions that couldn't be found."""
+    missing = set()
+    for prop in PROPERTIES:
+        if prop not in data:
+            continue
+        value = data[prop]
+        if prop in ('target', 'action'):
+            collection = bpy.data.objects if prop == 'target' else bpy.data.actions
+            name = value
+            value = collection.get(name) if name else None
+            if name and not value:
+                missing.add(name)
+        try:
+            setattr(pose, prop, value)
+        except (TypeError, ValueError):
+            print('Could not set %s on pose %s: %r' % (prop, pose.name, value))
+
+    # Bones are added in one go and their influences set in bulk
+    bones = data.get('bones', [])
+    pose.bones.clear()
+    for i in range(len(bones)):
+        pose.bones.add()
+    for ap_bone, (bone, influence) in zip(pose.bones, bones):
+        ap_bone.bone = bone
+    pose.bones.foreach_set('influence', [influence for bone, influence in bones])
+    pose.build_hash = ''
+    mark_lists_changed(pose.id_data)
+
+    return missing
+
+def encode_pose(data: dict, fields: list) -> bytes:
+    """Packs a pose dict into a binary record following the field list."""
+    parts = []
+    for name, kind in fields:
+        value = data[name]
+        if kind == 'BOOLEAN':
+            parts.append(struct.pack('<?', value))
+        elif kind == 'INT':
+            parts.append(struct.pack('<i', value))
+        elif kind == 'FLOAT':
+            parts.append(struct.pack('<d', value))
+        else:
+            parts.append(pack_string(value))
+
+    parts.append(struct.pack('<I', len(data['bones'])))
+    for bone, influence in data['bones']:
+        parts.append(pack_string(bone))
+        parts.append(struct.pack('<f', influence))
+
+    return b''.join(parts)
+
+def decode_pose(record: bytes, fields: list) -> dict:
+    """Unpacks a binary record into a pose dict."""
+    data = {}
+    offset = 0
+    for name, kind in fields:
+        if kind == 'BOOLEAN':
+            data[name] = struct.unpack_from('<?', record, offset)[0]
+            offset += 1
+        elif kind == 'INT':
+            data[name] = struct.unpack_from('<i', record, offset)[0]
+            offset += 4
+        elif kind == 'FLOAT':
+            data[name] = struct.unpack_from('<d', record, offset)[0]
+            offset += 8
+        else:
+            data[name], offset = unpack_string(record, offset)
+
+    bones = []
+    count = struct.unpack_from('<I', record, offset)[0]
+    offset += 4
+    for i in range(count):
+        bone, offset = unpack_string(record, offset)
+        bones.append([bone, struct.unpack_from('<f', record, offset)[0]])
+        offset += 4
+    data['bones'] = bones
+
+    return data
+
+def pack_string(value: str) -> bytes:
+    encoded = value.encode()
+    return struct.pack('<H', len(encoded)) + encoded
+
+def unpack_string(record: bytes, offset: int) -> tuple:
+    length = struct.unpack_from('<H', record, offset)[0]
+    offset += 2
+    return record[offset:offset + length].decode(), offset + length
+
+def pack_blob(data: bytes) -> bytes:
+    return struct.pack('<I', len(data)) + data
+
+def read_blob(file) -> bytes:
+    """Reads one length prefixed blob. Returns None at the end of the file."""
+    size = file.read(4)
+    if len(size) < 4:
+        return None
+    return file.read(struct.unpack('<I', size)[0])
@@ -1,10 +1,28 @@
 import bpy
+import json
 from . utilities import (is_valid_pose,
+                         pose_fingerprint,
                          purge_poses,
                          create_pose,
+                         restore_build_order,
                          toggle_pose_constraints,
-                         reset_bone_transforms,
-                         delete_temp_constraints)
+                         store_bone_transforms,
+                         reset_pose_transforms,
+                         restore_bone_transforms,
+                         delete_temp_constraints,
+                         create_edit_constraints,
+                         store_build_stats,
+                         clear_caches,
+                         mark_lists_changed,
+                         bone_symmetry_map,
+                         mirror_pose_record,
+                         mirror_action,
+                         swap_side_suffix)
+from . profiling import BuildProfile, profile_pose_costs
+from . runtime import clear_runtime
+from . range_check import sweep_poses
+from . library import pose_to_dict, apply_pose
+from . symmetry import name_side
 
 class DATA_OT_ap_pose_add(bpy.types.Operator):
     """Adds a new pose to the armature"""
@@ -32,6 +50,7 @@ class DATA_OT_ap_execute(bpy.types.Operator):
     bl_description = "Run the creation of all poses"
     bl_options = {"REGISTER", "UNDO"}
 
+    incremental: bpy.props.BoolProperty(name='Incremental', default=False, description='Only rebuild poses whose settings changed since the last build')
 
     @classmethod
     def poll(cls, context):
@@ -47,12 +66,154 @@ class DATA_OT_ap_execute(bpy.types.Operator):
         if armature.ap_state.editing:
             bpy.ops.armature.ap_action_edit(idx = armature.ap_poses_index)
 
-        purge_poses()
-        for pose in ap_poses:
-            if is_valid_pose(pose) and pose.build:
-                create_pose(pose)
+        # Paths are revalidated so a stale cached result never drops a pose from the build
+        clear_caches()
+
+        python_drivers = []
+        cache = {}
+        profile = BuildProfile()
+        # Rigs built before the manifest existed can't be updated selectively
+        if not self.incremental or not armature.ap_manifest:
+            with profile.phase('purge'):
+                purge_poses()
+            for pose in ap_poses:
+                with profile.phase('validate', pose.name):
+                    valid = is_valid_pose(pose) and pose.build
+                if valid:
+                    if not create_pose(pose, cache=cache, profile=profile):
+                        python_drivers.append(pose.name)
+                    with profile.phase('fingerprint', pose.name):
+                        pose.build_hash = pose_fingerprint(pose, cache)
+
+            message = 'Poses Created Successfully'
+        else:
+            # Only poses whose fingerprint changed get torn down and rebuilt
+            prefix = context.scene.ap_preferences.constraint_prefix
+            keep = set()
+            dirty = []
+            for pose in ap_poses:
+                with profile.phase('validate', pose.name):
+                    valid = is_valid_pose(pose) and pose.build
+                if not valid:
+                    continue
+                with profile.phase('fingerprint', pose.name):
+                    fingerprint = pose_fingerprint(pose, cache)
+                if pose.build_hash == fingerprint:
+                    keep.add(prefix + pose.name)
+                else:
+                    dirty.append((pose, fingerprint))
+
+            with profile.phase('purge'):
+                purge_poses(keep)
+            for pose, fingerprint in dirty:
+                if not create_pose(pose, cache=cache, profile=profile):
+                    python_drivers.append(pose.name)
+                pose.build_hash = fingerprint
+            if dirty:
+                with profile.phase('constraints'):
+                    restore_build_order(context.active_object, {prefix + pose.name for pose, fingerprint in dirty})
+
+            message = '%d Poses Rebuilt, %d Unchanged' %(len(dirty), len(keep))
+
+        profile.finish()
+        store_build_stats(context.active_object, profile)
+        clear_runtime()
+
+        if python_drivers:
+            self.report({'WARNING'}, 'Drivers need full Python evaluation: %s' %(', '.join(python_drivers)))
+        else:
+            self.report({'INFO'}, message + ' in %.2fs' %(profile.total))
+        return {'FINISHED'}
+
+
+class DATA_OT_ap_build_report(bpy.types.Operator):
+    bl_idname = "armature.ap_build_report"
+    bl_label = "Build Report"
+    bl_description = "Write the detailed timings of the last build to a text datablock as JSON"
+    bl_options = {"REGISTER"}
+
+    @classmethod
+    def poll(cls, context):
+        return context.mode == 'POSE' and context.active_object.data.ap_build_stats.report
+
+    def execute(self, context):
+        stats = context.active_object.data.ap_build_stats
+        name = 'AP Build Report'
+
+        text = bpy.data.texts.get(name) or bpy.data.texts.new(name)
+        text.from_string(json.dumps(json.loads(stats.report), indent=2))
+
+        self.report({'INFO'}, 'Build report written to text: %s' %(text.name))
+        return {'FINISHED'}
+
 
-        self.report({'INFO'}, 'Poses Created Successfully')
+class DATA_OT_ap_profile_costs(bpy.types.Operator):
+    bl_idname = "armature.ap_profile_costs"
+    bl_label = "Profile Pose Costs"
+    bl_description = "Sweep every built pose over its input range and rank the poses by the evaluation time they add per frame"
+    bl_options = {"REGISTER"}
+
+    samples : bpy.props.IntProperty(name='Samples', default=8, min=2, description='Frames evaluated per sweep')
+    repeat : bpy.props.IntProperty(name='Repeat', default=3, min=1, description='Sweeps per pose, the fastest one is kept')
+
+    @classmethod
+    def poll(cls, context):
+        armature = context.active_object.data
+        return context.mode == 'POSE' and armature.ap_manifest and not armature.ap_state.editing
+
+    def execute(self, context):
+        obj = context.active_object
+        stats = obj.data.ap_build_stats
+
+        results = profile_pose_costs(obj, self.samples, self.repeat)
+
+        stats.costs.clear()
+        for result in results:
+            item = stats.costs.add()
+            item.name = result['name']
+            item.cost = result['cost']
+            item.constraints = result['constraints']
+            item.drivers = result['drivers']
+        stats.costs_index = -1
+        mark_lists_changed(obj.data)
+
+        name = 'AP Cost Report'
+        text = bpy.data.texts.get(name) or bpy.data.texts.new(name)
+        text.from_string(json.dumps({'samples': self.samples, 'repeat': self.repeat, 'poses': results}, indent=2))
+
+        if results:
+            self.report({'INFO'}, 'Profiled %d poses, most expensive: %s (%.2f ms per frame)' %(len(results), results[0]['name'], results[0]['cost'] * 1000.0))
+        return {'FINISHED'}
+
+
+class DATA_OT_ap_sweep_test(bpy.types.Operator):
+    bl_idname = "armature.ap_sweep_test"
+    bl_label = "Range of Motion Test"
+    bl_description = "Sweep every built pose over its input range and check the evaluated influences against the expected ones"
+    bl_options = {"REGISTER"}
+
+    samples : bpy.props.IntProperty(name='Samples', default=5, min=2, description='Steps from min to max per pose')
+    tolerance : bpy.props.FloatProperty(name='Tolerance', default=0.0001, min=0.0, precision=5, description='Largest difference that still passes')
+
+    @classmethod
+    def poll(cls, context):
+        armature = context.active_object.data
+        return context.mode == 'POSE' and armature.ap_manifest and not armature.ap_state.editing
+
+    def execute(self, context):
+        report = sweep_poses(context.active_object, self.samples, self.tolerance)
+
+        name = 'AP Sweep Report'
+        text = bpy.data.texts.get(name) or bpy.data.texts.new(name)
+        text.from_string(json.dumps(report, indent=2))
+
+        message = '%d poses in %d frames, %.2fs' %(report['poses'], report['frames'], report['time'])
+        if report['missed']:
+            message += ', %d inputs could not be set and their poses were skipped' %(len(report['missed']))
+        if report['failed']:
+            self.report({'WARNING'}, '%d poses failed the range test: %s. %s, see text: %s' %(len(report['failed']), ', '.join(report['failed'][:5]), message, text.name))
+        else:
+            self.report({'INFO'}, 'All poses passed the range test: ' + message)
         return {'FINISHED'}
 
 
@@ -73,6 +234,7 @@ class DATA_OT_ap_purge(bpy.types.Operator):
         ap_poses = armature.ap_poses
 
         purge_poses()
+        clear_runtime()
         self.report({'INFO'}, 'Poses Purged Successfully')
         return {'FINISHED'}
 
@@ -88,6 +250,9 @@ class DATA_OT_ap_action_edit(bpy.types.Operator):
     @classmethod
     def poll(cls, context):
         if context.mode == 'POSE':
+            # Leaving edit mode is always possible
+            if context.active_object.data.ap_state.editing:
+                return True
             idx = context.active_object.data.ap_poses_index
             if context.active_object.data.ap_poses[idx].action:
                 return True
@@ -100,7 +265,6 @@ class DATA_OT_ap_action_edit(bpy.types.Operator):
         ap_pose = armature.ap_poses[self.idx]
         action = ap_pose.action
         ap_state = armature.ap_state
-        ap_bone_transforms = armature.ap_bone_transforms
 
         if ap_state.editing == False:
             ap_state.editing = True
@@ -124,15 +288,9 @@ class DATA_OT_ap_action_edit(bpy.types.Operator):
                 ap_state.active_bone = active_bone.name
 
             # Store bone transforms
-            for pose_bone in armature_pose.bones:
-                bone_transform = ap_bone_transforms.add()
-                bone_transform.name = pose_bone.name
-                bone_transform.location = pose_bone.location
-                bone_transform.rotation_euler = pose_bone.rotation_euler
-                bone_transform.rotation_quaternion = pose_bone.rotation_quaternion
-                bone_transform.rotation_mode = pose_bone.rotation_mode
-                bone_transform.scale = pose_bone.scale
-                reset_bone_transforms(pose_bone.name)
+            # Components keyed by the pose action are overwritten by it, so only the rest needs resetting
+            transforms = store_bone_transforms(obj)
+            reset_pose_transforms(obj, action, transforms)
 
             # Assign pose action
             if not obj.animation_data:
@@ -149,16 +307,7 @@ class DATA_OT_ap_action_edit(bpy.types.Operator):
             # Disable constraints
             toggle_pose_constraints(False)
             
-            # Recursive enabling of combo poses.
-            # Needed so that the edit combines all poses that go into combos+combos
-            if ap_pose.type == 'COMBO':
-                nested_pose_list = [ap_pose.corr_pose_A, ap_pose.corr_pose_B]
-                while nested_pose_list:
-                    pose = armature.ap_poses[nested_pose_list.pop(0)]
-                    if pose.type == 'COMBO':
-                        nested_pose_list.append(pose.corr_pose_A)
-                        nested_pose_list.append(pose.corr_pose_B)
-                    create_pose(pose, for_edit=True)
+            create_edit_constraints(ap_pose)
             self.report({'INFO'}, 'Action Edit engaged')
 
         else:
@@ -186,14 +335,8 @@ class DATA_OT_ap_action_edit(bpy.types.Operator):
             ap_state.active_action = ""
 
             # Selected bones restore
-            for bone in armature_pose.bones:
-                bone.bone.select = False
-                reset_bone_transforms(bone.name)
-                bone.location = ap_bone_transforms[bone.name].location
-                bone.rotation_euler = ap_bone_transforms[bone.name].rotation_euler
-                bone.rotation_quaternion = ap_bone_transforms[bone.name].rotation_quaternion
-                bone.rotation_mode = ap_bone_transforms[bone.name].rotation_mode
-                bone.scale = ap_bone_transforms[bone.name].scale
+            armature.bones.foreach_set('select', [False] * len(armature.bones))
+            restore_bone_transforms(obj)
             if ap_state.selected_bones:
                 for bone in ap_state.selected_bones:
                     try:
@@ -210,9 +353,6 @@ class DATA_OT_ap_action_edit(bpy.types.Operator):
                     print("Bone could not be made active: " + bone.name)
             ap_state.active_bone = ""
 
-            # Bone transforms clear
-            ap_bone_transforms.clear()
-
             # Enable Constraints
             delete_temp_constraints()
             toggle_pose_constraints(True)
@@ -231,6 +371,8 @@ class DATA_OT_ap_copy(bpy.types.Operator):
     bl_options = {"REGISTER", "UNDO"}
 
     mode : bpy.props.EnumProperty(name='Mode', description='Choose copy mode', items={('ALL', 'All', 'All', 0), ('ACTIVE', 'Active', 'Active', 1)}, default='ALL')
+    replace: bpy.props.BoolProperty(name='Replace Existing', default=False, description='Overwrite poses that have the same name instead of adding them alongside')
+    build: bpy.props.BoolProperty(name='Build', default=False, description='Build the poses on every target armature after copying')
 
     @classmethod
     def poll(cls, context):
@@ -239,28 +381,175 @@ class DATA_OT_ap_copy(bpy.types.Operator):
 
     def execute(self, context):
         source_obj = context.active_object
-        target_objs = context.selected_objects
-        target_objs.remove(source_obj)
+        target_objs = [obj for obj in context.selected_objects if obj != source_obj and obj.type == 'ARMATURE']
 
         source = source_obj.data.ap_poses
+        if self.mode=='ALL':
+            poses = source
+        else:
+            poses = [source[source_obj.data.ap_poses_index]]
+
+        # The source is read once, every target gets the same plain data
+        records = [pose_to_dict(pose) for pose in poses]
 
+        missing = set()
+        dropped = 0
+        no_driver = set()
         for target_obj in target_objs:
             target = target_obj.data.ap_poses
-
-            if self.mode=='ALL':
-                for source_pose in source:
+            bone_map = self.bone_map(target_obj)
+            existing = {pose.name: i for i, pose in enumerate(target)}
+
+            for record in records:
+                record = dict(record)
+                # Poses driven by the source rig are driven by the target rig instead
+                if record['target'] == source_obj.name:
+                    record['target'] = target_obj.name
+                bones = [[self.remap(bone_map, bone[0]), bone[1]] for bone in record['bones'] if self.remap(bone_map, bone[0])]
+                dropped += len(record['bones']) - len(bones)
+                record['bones'] = bones
+
+                driver = bpy.data.objects.get(record['target'])
+                if record['type'] == 'POSE' and record['target_type'] == 'BONE' and driver and driver.type == 'ARMATURE':
+                    driver_map = bone_map if driver == target_obj else self.bone_map(driver)
+                    if self.remap(driver_map, record['bone']):
+                        record['bone'] = self.remap(driver_map, record['bone'])
+                    else:
+                        no_driver.add(record['name'])
+
+                if self.replace and record['name'] in existing:
+                    pose = target[existing[record['name']]]
+                else:
                     pose = target.add()
-                    for k, v in source_pose.items():
-                        pose[k] = v
-            elif self.mode=='ACTIVE':
-                source_pose_index = source_obj.data.ap_poses_index
-                pose = target.add()
-                for k,v in source_obj.data.ap_poses[source_pose_index].items():
-                    pose[k] = v
-
-        self.report({'INFO'}, 'Poses Copied Successfully')
+                missing |= apply_pose(pose, record)
+
+            if target_obj.data.ap_poses_index < 0 and target:
+                target_obj.data.ap_poses_index = 0
+
+        failed = []
+        if self.build:
+            # Mode switches apply to every selected armature, so each target is built on its own
+            selected = context.selected_objects
+            for obj in selected:
+                obj.select_set(False)
+            for target_obj in target_objs:
+                if not self.build_target(context, target_obj):
+                    failed.append(target_obj.name)
+            for obj in selected:
+                obj.select_set(True)
+            context.view_layer.objects.active = source_obj
+
+        message = '%d Poses Copied to %d Armatures' %(len(records), len(target_objs))
+        if dropped:
+            message += ', %d bones not found on targets' %(dropped)
+        if no_driver:
+            message += '. Driver bone not found: %s' %(', '.join(sorted(no_driver)))
+        if missing or failed or no_driver:
+            if missing:
+                message += '. Not found: %s' %(', '.join(sorted(missing)))
+            if failed:
+                message += '. Build failed: %s' %(', '.join(failed))
+            self.report({'WARNING'}, message)
+        else:
+            self.report({'INFO'}, message)
         return {'FINISHED'}
 
+    def build_target(self, context: bpy.types.Context, obj: bpy.types.Object) -> bool:
+        """Builds the poses of one target armature in pose mode and puts it back in its previous mode.
+            Returns False when the build failed.
+        """
+        obj.select_set(True)
+        context.view_layer.objects.active = obj
+        mode = obj.mode
+        try:
+            if mode != 'POSE':
+                bpy.ops.object.mode_set(mode='POSE')
+            if obj.data.ap_poses:
+                bpy.ops.armature.ap_execute()
+            built = True
+        except RuntimeError:
+            built = False
+        if obj.mode != mode:
+            bpy.ops.object.mode_set(mode=mode)
+        obj.select_set(False)
+        return built
+
+    def bone_map(self, obj: bpy.types.Object) -> dict:
+        """Maps the armature's bone names, and their lower case versions, to the bone names."""
+        bone_map = {}
+        for bone in obj.data.bones:
+            bone_map.setdefault(bone.name.lower(), bone.name)
+        # Exact names win over case insensitive matches
+        bone_map.update({bone.name: bone.name for bone in obj.data.bones})
+        return bone_map
+
+    def remap(self, bone_map: dict, name: str) -> str:
+        """Returns the target bone for a source bone name: the same name, or one that only differs in case. Empty if none."""
+        return bone_map.get(name) or bone_map.get(name.lower(), '')
+
+
+class DATA_OT_ap_pose_mirror_all(bpy.types.Operator):
+    bl_idname = "armature.ap_pose_mirror_all"
+    bl_label = "Mirror All Poses"
+    bl_description = "Create the opposite side version of every pose on one side, including mirrored actions"
+    bl_options = {"REGISTER", "UNDO"}
+
+    side : bpy.props.EnumProperty(name='Side', description='Side whose poses get mirrored', items={('LEFT', 'Left', 'Mirror left poses to the right', 0), ('RIGHT', 'Right', 'Mirror right poses to the left', 1)}, default='LEFT')
+    mirror_actions: bpy.props.BoolProperty(name='Mirror Actions', default=True, description='Create mirrored copies of the pose actions. Otherwise existing opposite actions are used')
+    replace: bpy.props.BoolProperty(name='Replace Existing', default=True, description='Overwrite opposite poses that already exist instead of skipping them')
+
+    @classmethod
+    def poll(cls, context):
+        return context.mode == 'POSE' and context.active_object.data.ap_poses
+
+    def execute(self, context):
+        armature = context.active_object.data
+        ap_poses = armature.ap_poses
+
+        # The symmetry map is computed once for all poses and actions
+        bone_map = bone_symmetry_map(armature)
+        sources = [pose for pose in ap_poses if name_side(pose.name) == self.side]
+        records = [pose_to_dict(pose) for pose in sources]
+        existing = {pose.name: i for i, pose in enumerate(ap_poses)}
+
+        actions = {}
+        created = 0
+        replaced = 0
+        for record in records:
+            mirrored = mirror_pose_record(record, bone_map)
+            if mirrored['name'] in existing and not self.replace:
+                continue
+
+            if record['action']:
+                if record['action'] not in actions:
+                    actions[record['action']] = self.opposite_action(record, mirrored, bone_map)
+                mirrored['action'] = actions[record['action']]
+
+            if mirrored['name'] in existing:
+                pose = ap_poses[existing[mirrored['name']]]
+                replaced += 1
+            else:
+                pose = ap_poses.add()
+                created += 1
+            apply_pose(pose, mirrored)
+
+        self.report({'INFO'}, '%d Poses Mirrored, %d Replaced, %d Actions' %(created, replaced, len(actions)))
+        return {'FINISHED'}
+
+    def opposite_action(self, record: dict, mirrored: dict, bone_map: dict) -> str:
+        """Returns the name of the action the mirrored pose uses, mirroring it if enabled."""
+        prefs = bpy.context.scene.ap_preferences
+        name = swap_side_suffix(record['action'])
+        if name == record['action']:
+            prefix = prefs.combo_prefix if mirrored['type'] == 'COMBO' else prefs.pose_prefix
+            name = prefix + mirrored['name']
+
+        if self.mirror_actions and name != record['action']:
+            return mirror_action(bpy.data.actions[record['action']], name, bone_map).name
+        if name in bpy.data.actions:
+            return name
+        return record['action']
+
 
 class DATA_OT_ap_clear(bpy.types.Operator):
     bl_idname = "armature.ap_clear"
@@ -283,9 +572,13 @@ class DATA_OT_ap_clear(bpy.types.Operator):
 classes = [
     DATA_OT_ap_pose_add,
     DATA_OT_ap_execute,
+    DATA_OT_ap_build_report,
+    DATA_OT_ap_profile_costs,
+    DATA_OT_ap_sweep_test,
     DATA_OT_ap_purge,
     DATA_OT_ap_action_edit,
     DATA_OT_ap_copy,
+    DATA_OT_ap_pose_mirror_all,
     DATA_OT_ap_clear,
 ]
 
@@ -0,0 +1,148 @@
+import time
+from contextlib import contextmanager
+
+PHASES = ['purge', 'validate', 'fingerprint', 'variables', 'constraints', 'drivers']
+
+class BuildProfile:
+    """Collects per phase and per pose timings of a build."""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.total = 0.0
+        self.phases = dict.fromkeys(PHASES, 0.0)
+        self.poses = {}
+        self.counts = {'poses': 0, 'constraints': 0, 'drivers': 0, 'variables': 0}
+
+    @contextmanager
+    def phase(self, name: str, pose: str=''):
+        """Times the enclosed block and adds it to the phase and, if given, the pose."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.phases[name] = self.phases.get(name, 0.0) + elapsed
+            if pose:
+                timings = self.poses.setdefault(pose, {})
+                timings[name] = timings.get(name, 0.0) + elapsed
+
+    def count(self, name: str, amount: int=1) -> None:
+        """Adds to one of the created object counters."""
+        self.counts[name] = self.counts.get(name, 0) + amount
+
+    def finish(self) -> None:
+        """Stops the build clock."""
+        self.total = time.perf_counter() - self.start
+
+    def pose_times(self) -> list:
+        """Returns (pose name, seconds) pairs, slowest first."""
+        return sorted(((name, sum(timings.values())) for name, timings in self.poses.items()), key=lambda item: item[1], reverse=True)
+
+    def report(self) -> dict:
+        """Returns the full profile as plain data, ready for JSON."""
+        return {
+            'total': self.total,
+            'phases': self.phases,
+            'counts': self.counts,
+            'poses': [dict(name=name, total=total, **self.poses[name]) for name, total in self.pose_times()],
+        }
+
+
+def profile_pose_costs(obj, samples: int=8, repeat: int=3) -> list:
+    """Ranks the built poses of an armature object by what they add to depsgraph evaluation.
+        Each pose's inputs are swept over their range, timing every frame with the pose's constraints and drivers
+        enabled and then muted. The difference is the pose's incremental cost per frame. Returns one dict per pose,
+        most expensive first.
+    """
+    import bpy
+    from . utilities import get_pose, collect_inputs, snapshot_inputs, restore_inputs
+
+    armature = obj.data
+    pose_bones = obj.pose.bones
+    view_layer = bpy.context.view_layer
+    drivers = driver_curves(obj)
+    cache = {}
+
+    poses = []
+    specs = []
+    for entry in armature.ap_manifest:
+        pose = get_pose(armature, entry.pose, cache)
+        if not pose:
+            continue
+        inputs = list(collect_inputs(pose, cache).values())
+        constraints = []
+        for bone in entry.bones:
+            pose_bone = pose_bones.get(bone.name)
+            constraint = pose_bone.constraints.get(entry.name) if pose_bone else None
+            if constraint:
+                constraints.append(constraint)
+        poses.append((entry, inputs, constraints, pose_drivers(entry, drivers)))
+        specs += inputs
+
+    results = []
+    snapshot = snapshot_inputs(specs)
+    try:
+        for entry, inputs, constraints, fcurves in poses:
+            states = [constraint.enabled for constraint in constraints]
+            mutes = [fcurve.mute for fcurve in fcurves]
+            timings = {}
+            try:
+                for enabled in (True, False):
+                    for constraint in constraints:
+                        constraint.enabled = enabled
+                    for fcurve in fcurves:
+                        fcurve.mute = not enabled
+                    timings[enabled] = time_sweep(inputs, samples, repeat, view_layer)
+            finally:
+                for constraint, state in zip(constraints, states):
+                    constraint.enabled = state
+                for fcurve, mute in zip(fcurves, mutes):
+                    fcurve.mute = mute
+
+            results.append({
+                'name': entry.pose,
+                'cost': max(0.0, timings[True] - timings[False]),
+                'enabled': timings[True],
+                'muted': timings[False],
+                'constraints': len(constraints),
+                'drivers': len(fcurves),
+                'inputs': len(inputs),
+            })
+    finally:
+        restore_inputs(snapshot)
+        view_layer.update()
+
+    return sorted(results, key=lambda result: result['cost'], reverse=True)
+
+def time_sweep(inputs: list, samples: int, repeat: int, view_layer) -> float:
+    """Returns the seconds per frame of evaluating the view layer while the inputs sweep from min to max.
+        The fastest of repeat runs is kept, it is the one least disturbed by the rest of the system.
+    """
+    from . utilities import input_value, write_input
+
+    steps = [i / (samples - 1) for i in range(samples)] if samples > 1 else [1.0]
+    best = float('inf')
+    for i in range(repeat):
+        start = time.perf_counter()
+        for step in steps:
+            for spec in inputs:
+                write_input(spec, input_value(spec, step))
+            view_layer.update()
+        best = min(best, (time.perf_counter() - start) / len(steps))
+
+    return best
+
+def driver_curves(obj) -> dict:
+    """Returns the driver F-Curves on the armature object and on its data, by data path."""
+    curves = {}
+    for key, owner in (('object', obj), ('data', obj.data)):
+        drivers = owner.animation_data.drivers if owner.animation_data else []
+        curves[key] = {fcurve.data_path: fcurve for fcurve in drivers}
+    return curves
+
+def pose_drivers(entry, curves: dict) -> list:
+    """Returns the driver F-Curves a build created for one manifest entry: constraint eval_time, pose influence and shared property."""
+    paths = ['pose.bones["%s"].constraints["%s"].eval_time' % (bone.name, entry.name) for bone in entry.bones]
+    fcurves = [curves['object'][path] for path in paths if path in curves['object']]
+    fcurves += [curves['data'][path] for path in ('ap_poses["%s"].influence' % entry.pose, '["%s"]' % entry.name) if path in curves['data']]
+    return fcurves
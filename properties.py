@@ -1,20 +1,20 @@
 import bpy
-from . utilities import poll_is_armature_object, update_ap_poses_index
+from . utilities import poll_is_armature_object, update_ap_poses_index, update_pose_path, update_pose_name, update_list_revision
 
 class APBones(bpy.types.PropertyGroup):
-    bone : bpy.props.StringProperty(name='Bone', default='', description='Bone that will be animated in pose.')
-    influence : bpy.props.FloatProperty(name='Influnce', default=1.0, min=0.0, max=1.0, precision=3)
+    bone : bpy.props.StringProperty(name='Bone', default='', description='Bone that will be animated in pose.', update=update_list_revision)
+    influence : bpy.props.FloatProperty(name='Influnce', default=1.0, min=0.0, max=1.0, precision=3, update=update_list_revision)
 
 class APPoses(bpy.types.PropertyGroup):
-    name : bpy.props.StringProperty(name="Pose Name", default="",description="Name of pose")
+    name : bpy.props.StringProperty(name="Pose Name", default="",description="Name of pose", update=update_pose_name)
     build : bpy.props.BoolProperty(name="Build", default = True, description="Exclude pose when build is executed")
-    type : bpy.props.EnumProperty(name='Type', description='Type of action pose', items={('POSE', 'Pose', 'Pose', 0), ('COMBO', 'Combo', 'Combo', 1)}, default='POSE')
-    target_type : bpy.props.EnumProperty(name='Driver Property', description='Choose if the pose will be driven by a property or bone transform', items={('BONE', 'Channel', 'Channel', 0), ('PROP', 'Path', 'Path', 1)}, default='BONE')
+    type : bpy.props.EnumProperty(name='Type', description='Type of action pose', items={('POSE', 'Pose', 'Pose', 0), ('COMBO', 'Combo', 'Combo', 1)}, default='POSE', update=update_list_revision)
+    target_type : bpy.props.EnumProperty(name='Driver Property', description='Choose if the pose will be driven by a property or bone transform', items={('BONE', 'Channel', 'Channel', 0), ('PROP', 'Path', 'Path', 1)}, default='BONE', update=update_list_revision)
 
     # Pose type
-    target : bpy.props.PointerProperty(type=bpy.types.Object, poll=poll_is_armature_object, name='Target', description='Target object')
-    bone : bpy.props.StringProperty(name='Bone', default='', description='Target bone that will be the shape driver')
-    data_path : bpy.props.StringProperty(name='Path', default='', description='Target path that will be the shape driver')
+    target : bpy.props.PointerProperty(type=bpy.types.Object, poll=poll_is_armature_object, name='Target', description='Target object', update=update_pose_path)
+    bone : bpy.props.StringProperty(name='Bone', default='', description='Target bone that will be the shape driver', update=update_list_revision)
+    data_path : bpy.props.StringProperty(name='Path', default='', description='Target path that will be the shape driver', update=update_pose_path)
     channel : bpy.props.EnumProperty(name='Channel', description='Bone channel that will drive the action', items=(
                                                                                                                     ('LOC_X', 'Location X', 'Location X', 0),
                                                                                                                     ('LOC_Y', 'Location Y', 'Location Y', 1),
@@ -59,7 +59,7 @@ class APPoses(bpy.types.PropertyGroup):
     corr_pose_A : bpy.props.StringProperty(name='Pose A', description='Pose that will trigger the combo')
     corr_pose_B : bpy.props.StringProperty(name='Pose B', description='Pose that will trigger the combo')
 
-    action : bpy.props.PointerProperty(type=bpy.types.Action, name='Action', description='Target action')
+    action : bpy.props.PointerProperty(type=bpy.types.Action, name='Action', description='Target action', update=update_list_revision)
     start_frame : bpy.props.IntProperty(name='Start Frame', default = 0, description='Start frame for the action')
     end_frame : bpy.props.IntProperty(name='End Frame', default = 10, description='End frame for the action')
 
@@ -67,25 +67,51 @@ class APPoses(bpy.types.PropertyGroup):
 
     bones : bpy.props.CollectionProperty(type=APBones)
 
+    build_hash : bpy.props.StringProperty(name='Build Hash', default='', description='Fingerprint of the settings the pose was last built with', options={'HIDDEN'})
+
 class APPreferences(bpy.types.PropertyGroup):
-    constraint_prefix : bpy.props.StringProperty(name='Constraint Prefix', default='AP-', description='Prefix that will be added to all constraints made by Action Poser. Purging will not work if prefix changes after poses are created.')
+    constraint_prefix : bpy.props.StringProperty(name='Constraint Prefix', default='AP-', description='Prefix that will be added to all constraints made by Action Poser')
     left_suffix : bpy.props.StringProperty(name='Left Suffix', default='.L', description='Set this to the convention you have used on bones')
     right_suffix : bpy.props.StringProperty(name='Right Suffix', default='.R', description='Set this to the convention you have used on bones')
+    symmetry_conventions : bpy.props.StringProperty(name='Conventions', default='*_L/*_R, *_l/*_r, Left*/Right*', description='More side conventions, comma separated left/right pairs. * stands for the rest of the name, e.g. *_l/*_r, Left*/Right*, *_L_*/*_R_*')
     pose_prefix : bpy.props.StringProperty(name='Pose Prefix', default='AP-', description='Prefix that will be added when creating a new pose action')
     combo_prefix : bpy.props.StringProperty(name='Combo Prefix', default='AC-', description='Prefix that will be added when creating a new combo action')
     default_name : bpy.props.StringProperty(name='Default Name', default='Pose', description='Defines how new poses will be named')
+    driver_mode : bpy.props.EnumProperty(name='Drivers', description='How constraint drivers are built', items=(
+                                                                                                                    ('BONE', 'Per Bone', 'Every constraint evaluates the full driver expression', 0),
+                                                                                                                    ('SHARED', 'Shared', 'Each pose evaluates its driver once into an armature property that all of its constraints read', 1),
+                                                                                                                    ('HANDLER', 'Handler', 'No drivers. A single handler evaluates every pose with NumPy and writes the constraints directly', 2)), default='BONE')
 
 
 class APStringList(bpy.types.PropertyGroup):
     name : bpy.props.StringProperty(name='name', default='')
 
-class APBoneTransform(bpy.types.PropertyGroup):
-    name : bpy.props.StringProperty(name='name', default='')
-    location : bpy.props.FloatVectorProperty(name='location', subtype='TRANSLATION')
-    rotation_euler : bpy.props.FloatVectorProperty(name='rotation_euler', subtype='EULER')
-    rotation_quaternion : bpy.props.FloatVectorProperty(name='rotation_quaternion', subtype='QUATERNION',size=4)
-    rotation_mode : bpy.props.StringProperty(name='rotation_mode', default='')
-    scale : bpy.props.FloatVectorProperty(name='scale', subtype='XYZ')
+class APManifest(bpy.types.PropertyGroup):
+    name : bpy.props.StringProperty(name='Constraint', default='', description='Name of the constraints created for the pose')
+    pose : bpy.props.StringProperty(name='Pose', default='', description='Name of the pose at build time')
+    bones : bpy.props.CollectionProperty(type=APStringList)
+
+class APPoseTiming(bpy.types.PropertyGroup):
+    name : bpy.props.StringProperty(name='Pose', default='')
+    time : bpy.props.FloatProperty(name='Time', default=0.0, unit='TIME_ABSOLUTE')
+
+class APPoseCost(bpy.types.PropertyGroup):
+    name : bpy.props.StringProperty(name='Pose', default='')
+    cost : bpy.props.FloatProperty(name='Cost', default=0.0, unit='TIME_ABSOLUTE', description='Evaluation time the pose adds to every frame')
+    constraints : bpy.props.IntProperty(name='Constraints', default=0)
+    drivers : bpy.props.IntProperty(name='Drivers', default=0)
+
+class APBuildStats(bpy.types.PropertyGroup):
+    total_time : bpy.props.FloatProperty(name='Total Time', default=0.0, unit='TIME_ABSOLUTE')
+    poses : bpy.props.IntProperty(name='Poses', default=0)
+    rebuilt : bpy.props.IntProperty(name='Rebuilt', default=0, description='Poses the last build created, fewer than the total after an incremental build')
+    constraints : bpy.props.IntProperty(name='Constraints', default=0)
+    drivers : bpy.props.IntProperty(name='Drivers', default=0)
+    slowest : bpy.props.CollectionProperty(type=APPoseTiming)
+    report : bpy.props.StringProperty(name='Report', default='', description='Detailed JSON profile of the last build')
+    driver_mode : bpy.props.StringProperty(name='Driver Mode', default='', description='Driver mode the rig was last built with')
+    costs : bpy.props.CollectionProperty(type=APPoseCost)
+    costs_index : bpy.props.IntProperty(default=-1)
 
 class APState(bpy.types.PropertyGroup):
     active_object : bpy.props.StringProperty(name='Active Object', default='')
@@ -101,8 +127,11 @@ classes = [
     APPoses,
     APPreferences,
     APStringList,
+    APManifest,
+    APPoseTiming,
+    APPoseCost,
+    APBuildStats,
     APState,
-    APBoneTransform,
 ]
 
 
@@ -114,7 +143,8 @@ def register():
 
     bpy.types.Armature.ap_poses = bpy.props.CollectionProperty(type=APPoses)
     bpy.types.Armature.ap_state = bpy.props.PointerProperty(type=APState)
-    bpy.types.Armature.ap_bone_transforms = bpy.props.CollectionProperty(type=APBoneTransform)
+    bpy.types.Armature.ap_manifest = bpy.props.CollectionProperty(type=APManifest)
+    bpy.types.Armature.ap_build_stats = bpy.props.PointerProperty(type=APBuildStats)
     bpy.types.Scene.ap_preferences = bpy.props.PointerProperty(type=APPreferences)
     bpy.types.Armature.ap_poses_index = bpy.props.IntProperty(default=-1, update = update_ap_poses_index)
     bpy.types.Armature.ap_bones_index = bpy.props.IntProperty(default=-1)
@@ -124,6 +154,8 @@ def unregister():
 
     del bpy.types.Armature.ap_poses
     del bpy.types.Armature.ap_state
+    del bpy.types.Armature.ap_manifest
+    del bpy.types.Armature.ap_build_stats
     del bpy.types.Scene.ap_preferences
     del bpy.types.Armature.ap_poses_index
     del bpy.types.Armature.ap_bones_index
@@ -0,0 +1,192 @@
+"""Range of motion checks for built poses.
+
+Every pose's driver inputs are swept from transform_min to transform_max and the pose influence and constraint
+eval_time Blender evaluates are compared against the values the written inputs should give: (x - min) / (max - min)
+clamped to 0..1 for poses, min() over the component inputs for combos. Inputs are also read back after each
+evaluation. Ones that didn't land where they were written are reported, and the poses using them aren't checked.
+
+Poses whose inputs don't share a channel are swept together, each evaluated step checks every pose at once.
+"""
+import time
+
+import bpy
+import numpy as np
+
+from . evaluator import input_name
+from . expressions import fold_range
+from . runtime import build_runtime, read_inputs
+from . utilities import get_pose, collect_inputs, input_value, write_input, snapshot_inputs, restore_inputs
+
+def channel_key(key: tuple) -> tuple:
+    """Returns what a written input touches: its target, bone or path and channel group.
+        Rotation channels share one group since quaternion bones are written as a whole, as do scale channels.
+    """
+    target, source, channel = key[:3]
+    if channel.startswith(('ROT', 'SCALE')):
+        channel = channel.split('_')[0]
+    return (target, source, channel)
+
+def plan_batches(poses: list) -> list:
+    """Groups (index, inputs) pairs so that no two poses of a batch write the same channel.
+        Regular poses are packed first, combos after them, each into the first batch it fits.
+    """
+    batches = []
+    for index, inputs in poses:
+        touched = {channel_key(key) for key in inputs}
+        for batch in batches:
+            if not touched & batch['touched']:
+                break
+        else:
+            batch = {'poses': [], 'touched': set()}
+            batches.append(batch)
+        batch['poses'].append(index)
+        batch['touched'] |= touched
+
+    return batches
+
+def channel_terms(inputs: dict) -> list:
+    """Returns (channel, scale, offset) for each input of a pose. The channel is the input key without its range."""
+    terms = []
+    for key, spec in inputs.items():
+        scale, offset = fold_range(spec['transform_min'], spec['transform_max'], 'ROT' in spec.get('transform_type', ''))
+        terms.append((key[:5], scale, offset))
+    return terms
+
+def read_results(obj: bpy.types.Object, runtime: dict, depsgraph: bpy.types.Depsgraph) -> tuple:
+    """Returns the evaluated influence of every runtime pose and the eval_time of each of its constraints."""
+    evaluated = obj.evaluated_get(depsgraph)
+    ap_poses = evaluated.data.ap_poses
+    pose_bones = evaluated.pose.bones
+    lookup = runtime['lookup']
+
+    influences = np.full(len(runtime['constraints']), np.nan)
+    eval_times = []
+    for i, (pose_name, constraint_name, bones) in enumerate(runtime['constraints']):
+        index = lookup.get(pose_name)
+        if index is not None and index < len(ap_poses):
+            influences[i] = ap_poses[index].influence
+        times = []
+        for bone in bones:
+            pose_bone = pose_bones.get(bone)
+            constraint = pose_bone.constraints.get(constraint_name) if pose_bone else None
+            if constraint:
+                times.append((bone, constraint.eval_time))
+        eval_times.append(times)
+
+    return influences, eval_times
+
+def sweep_poses(obj: bpy.types.Object, samples: int=5, tolerance: float=1e-4) -> dict:
+    """Sweeps every built pose of an armature object over its input range and checks what Blender evaluates.
+        Returns a report with the batches, the number of checked values and every mismatch found.
+    """
+    start = time.perf_counter()
+    armature = obj.data
+    view_layer = bpy.context.view_layer
+    handler = armature.ap_build_stats.driver_mode == 'HANDLER'
+    runtime = build_runtime(obj)
+    cache = {}
+
+    poses = []
+    combos = set()
+    specs = []
+    terms = []
+    # Where each channel's read back value sits in the runtime's input array
+    indices = {spec['name']: spec['index'] for spec in runtime['setup']['inputs']}
+    channels = {}
+    for i, (pose_name, constraint_name, bones) in enumerate(runtime['constraints']):
+        pose = get_pose(armature, pose_name, cache)
+        inputs = collect_inputs(pose, cache)
+        poses.append((i, inputs))
+        terms.append(channel_terms(inputs))
+        specs += inputs.values()
+        for key, spec in inputs.items():
+            channels[key[:5]] = indices.get(input_name(dict(spec, target=spec['target'].name if spec['target'] else '')))
+        if pose.type == 'COMBO':
+            combos.add(i)
+    # Combos go last so the regular poses fill the first batches
+    poses.sort(key=lambda item: item[0] in combos)
+    batches = plan_batches(poses)
+    steps = np.linspace(0.0, 1.0, max(2, samples))
+
+    report = {
+        'armature': obj.name,
+        'driver_mode': armature.ap_build_stats.driver_mode,
+        'samples': len(steps),
+        'tolerance': tolerance,
+        'poses': len(poses),
+        'batches': len(batches),
+        'frames': len(batches) * len(steps),
+        'checked': 0,
+        'unwritable': [],
+        'missed': [],
+        'failed': [],
+        'mismatches': [],
+    }
+    inputs = dict(poses)
+    names = [constraint[0] for constraint in runtime['constraints']]
+    failed = set()
+    unwritable = set()
+    missed = {}
+
+    snapshot = snapshot_inputs(specs)
+    try:
+        for batch in batches:
+            restore_inputs(snapshot)
+            swept = set(batch['poses'])
+            for step in steps:
+                written = {}
+                for index in batch['poses']:
+                    for key, spec in inputs[index].items():
+                        value = input_value(spec, step)
+                        if write_input(spec, value):
+                            written[key[:5]] = value
+                        else:
+                            unwritable.add(names[index])
+                view_layer.update()
+                if handler:
+                    # The handler writes the constraints after the update, one more evaluation shows them
+                    view_layer.update()
+
+                depsgraph = bpy.context.evaluated_depsgraph_get()
+                values = read_inputs(runtime, depsgraph)
+                landed = {}
+                for channel, value in written.items():
+                    index = channels.get(channel)
+                    read = float(values[index]) if index is not None else float('nan')
+                    landed[channel] = abs(read - value) <= tolerance
+                    if not landed[channel]:
+                        label = ':'.join(str(part) for part in channel if part)
+                        missed.setdefault(label, {'input': label, 'step': float(step), 'written': value, 'read': read})
+
+                influences, eval_times = read_results(obj, runtime, depsgraph)
+
+                for i, name in enumerate(names):
+                    # Only poses whose inputs were all written and landed have a known expected value
+                    if not all(landed.get(channel) for channel, scale, offset in terms[i]):
+                        continue
+                    expected = min((written[channel] * scale + offset for channel, scale, offset in terms[i]), default=0.0)
+                    expected = min(max(expected, 0.0), 1.0)
+
+                    checks = [('influence', influences[i])] + [('eval_time:' + bone, value) for bone, value in eval_times[i]]
+                    for kind, actual in checks:
+                        report['checked'] += 1
+                        if abs(actual - expected) <= tolerance:
+                            continue
+                        failed.add(name)
+                        report['mismatches'].append({
+                            'pose': name,
+                            'check': kind,
+                            'step': float(step),
+                            'swept': i in swept,
+                            'expected': expected,
+                            'actual': float(actual),
+                        })
+    finally:
+        restore_inputs(snapshot)
+        view_layer.update()
+
+    report['failed'] = sorted(failed)
+    report['unwritable'] = sorted(unwritable)
+    report['missed'] = list(missed.values())
+    report['time'] = time.perf_counter() - start
+    return report
@@ -0,0 +1,226 @@
+"""Driver-free runtime for rigs built in Handler mode.
+
+The build creates the action constraints without any drivers. A single handler reads every driver channel the poses
+use in bulk, evaluates all pose influences with the NumPy evaluator and writes eval_time only where it changed.
+"""
+import bpy
+import numpy as np
+from bpy.app.handlers import persistent
+
+from . evaluator import pose_terms, evaluate_influences, matrix_channels, auto_rot_mode
+from . utilities import get_pose, pose_lookup, list_revision
+
+runtimes = {}
+updating = False
+
+def build_runtime(obj: bpy.types.Object) -> dict:
+    """Collects what the handler needs to evaluate one armature: the pose terms, the inputs grouped
+        by target object and the constraints of every built pose.
+    """
+    armature = obj.data
+    pose_bones = obj.pose.bones
+    cache = {}
+    inputs = {}
+    poses = []
+    constraints = []
+    writers = []
+
+    for entry in armature.ap_manifest:
+        pose = get_pose(armature, entry.pose, cache)
+        if not pose:
+            continue
+        poses.append({'name': pose.name, 'terms': pose_terms(pose, inputs, cache)})
+        constraints.append((pose.name, entry.name, [bone.name for bone in entry.bones]))
+        # Resolved once here so the handler only assigns eval_time
+        resolved = []
+        for bone in entry.bones:
+            pose_bone = pose_bones.get(bone.name)
+            constraint = pose_bone.constraints.get(entry.name) if pose_bone else None
+            if constraint:
+                resolved.append(constraint)
+        writers.append(resolved)
+
+    targets = {}
+    for spec in inputs.values():
+        target = bpy.data.objects.get(spec['target'])
+        if not target:
+            continue
+        group = targets.setdefault(target.name, {'paths': [], 'index': [], 'bones': [], 'spaces': [], 'channels': [], 'rot_modes': []})
+        if 'data_path' in spec:
+            group['paths'].append((spec['index'], spec['data_path']))
+        elif spec['bone_target'] in target.pose.bones:
+            group['index'].append(spec['index'])
+            group['bones'].append(target.pose.bones.find(spec['bone_target']))
+            group['spaces'].append(spec['transform_space'])
+            group['channels'].append(spec['transform_type'])
+            rot_mode = spec.get('rot_mode', 'AUTO')
+            if rot_mode == 'AUTO':
+                # Drivers read AUTO in the driver bone's own rotation order
+                rot_mode = auto_rot_mode(target.pose.bones[spec['bone_target']].rotation_mode)
+            group['rot_modes'].append(rot_mode)
+
+    for name, group in targets.items():
+        if 'LOCAL_SPACE' in group['spaces']:
+            group['rest'], group['parents'] = rest_matrices(bpy.data.objects[name])
+        group['index'] = np.array(group['index'], dtype=int)
+        group['bones'] = np.array(group['bones'], dtype=int)
+        group['spaces'] = np.array(group['spaces'], dtype=str)
+
+    lookup = pose_lookup(armature, cache)
+
+    return {
+        'setup': {'inputs': list(inputs.values()), 'poses': poses},
+        'constraints': constraints,
+        'writers': writers,
+        'targets': targets,
+        'signature': runtime_signature(armature),
+        'lookup': lookup,
+        'indices': np.array([lookup[pose['name']] for pose in poses], dtype=int),
+        'influences': np.zeros(len(armature.ap_poses), dtype=np.float32),
+        'last': np.full(len(poses), -1.0),
+    }
+
+def runtime_signature(armature: bpy.types.Armature) -> tuple:
+    """Returns what a runtime depends on: the manifest, and the pose list whose indices it writes to."""
+    return (len(armature.ap_manifest), len(armature.ap_poses), list_revision(armature))
+
+def rest_matrices(obj: bpy.types.Object) -> tuple:
+    """Returns the armature space rest matrices of all bones, in pose bone order, and their parent indices."""
+    bones = obj.data.bones
+    rest = np.empty(len(bones) * 16, dtype=np.float32)
+    bones.foreach_get('matrix_local', rest)
+    parents = np.array([bones.find(bone.parent.name) if bone.parent else -1 for bone in bones], dtype=int)
+
+    return rest.reshape(-1, 4, 4).transpose(0, 2, 1).astype(float), parents
+
+def bone_matrices(obj: bpy.types.Object, group: dict) -> np.ndarray:
+    """Returns the matrices of the group's input bones in each input's driver space."""
+    pose_bones = obj.pose.bones
+    count = len(pose_bones)
+    spaces = group['spaces']
+
+    pose = np.empty(count * 16, dtype=np.float32)
+    pose_bones.foreach_get('matrix', pose)
+    # foreach_get hands out matrices column by column
+    pose = pose.reshape(count, 4, 4).transpose(0, 2, 1).astype(float)
+    matrices = pose[group['bones']]
+
+    world = spaces == 'WORLD_SPACE'
+    if world.any():
+        matrices[world] = np.array(obj.matrix_world) @ matrices[world]
+
+    transform = spaces == 'TRANSFORM_SPACE'
+    if transform.any():
+        basis = np.empty(count * 16, dtype=np.float32)
+        pose_bones.foreach_get('matrix_basis', basis)
+        matrices[transform] = basis.reshape(count, 4, 4).transpose(0, 2, 1)[group['bones'][transform]]
+
+    local = spaces == 'LOCAL_SPACE'
+    if local.any():
+        # Local space is the pose matrix relative to the bone's rest, as carried by its posed parent
+        rest = group['rest']
+        bones = group['bones'][local]
+        parents = group['parents'][bones]
+        space = rest[bones]
+        has_parent = parents >= 0
+        space[has_parent] = pose[parents[has_parent]] @ np.linalg.inv(rest[parents[has_parent]]) @ space[has_parent]
+        matrices[local] = np.linalg.inv(space) @ pose[bones]
+
+    return matrices
+
+def read_inputs(runtime: dict, depsgraph: bpy.types.Depsgraph=None) -> np.ndarray:
+    """Reads the current value of every input of a runtime, from evaluated data when a depsgraph is given."""
+    values = np.zeros(len(runtime['setup']['inputs']))
+
+    for name, group in runtime['targets'].items():
+        target = bpy.data.objects.get(name)
+        if not target:
+            continue
+        if depsgraph:
+            target = target.evaluated_get(depsgraph)
+
+        for index, data_path in group['paths']:
+            try:
+                values[index] = float(target.path_resolve(data_path))
+            except (ValueError, TypeError):
+                pass
+
+        if len(group['bones']):
+            values[group['index']] = matrix_channels(bone_matrices(target, group), group['channels'], group['rot_modes'])
+
+    return values
+
+def apply_runtime(obj: bpy.types.Object, runtime: dict, depsgraph: bpy.types.Depsgraph=None) -> int:
+    """Evaluates all poses of an armature and writes the influences that changed. Returns how many poses were written."""
+    values = read_inputs(runtime, depsgraph)
+    influences = evaluate_influences(runtime['setup'], values[None, :])[0]
+    changed = np.flatnonzero(np.abs(influences - runtime['last']) > 1e-6)
+
+    if not len(changed):
+        return 0
+
+    writers = runtime['writers']
+    for i in changed:
+        value = float(influences[i])
+        for constraint in writers[i]:
+            constraint.eval_time = value
+
+    # Pose influences go out in one bulk write, read first so poses the runtime doesn't drive keep their value
+    ap_poses = obj.data.ap_poses
+    values = runtime['influences']
+    ap_poses.foreach_get('influence', values)
+    values[runtime['indices'][changed]] = influences[changed]
+    ap_poses.foreach_set('influence', values)
+
+    runtime['last'][changed] = influences[changed]
+    return len(changed)
+
+def get_runtime(obj: bpy.types.Object) -> dict:
+    """Returns the cached runtime of an armature, building it when missing or out of date.
+        Poses that get added, removed, moved or renamed change the signature and rebuild it.
+    """
+    runtime = runtimes.get(obj.name)
+    if runtime is None or runtime['signature'] != runtime_signature(obj.data):
+        runtime = runtimes[obj.name] = build_runtime(obj)
+    return runtime
+
+@persistent
+def clear_runtime(*args) -> None:
+    """Drops all cached runtimes. Needed after builds, undo and file loads."""
+    runtimes.clear()
+
+@persistent
+def runtime_handler(scene: bpy.types.Scene, depsgraph: bpy.types.Depsgraph=None) -> None:
+    """Drives every armature in the scene that was built in Handler mode."""
+    global updating
+    if updating:
+        return
+
+    updating = True
+    try:
+        for obj in scene.objects:
+            if obj.type != 'ARMATURE' or obj.data.ap_build_stats.driver_mode != 'HANDLER':
+                continue
+            if obj.mode == 'EDIT':
+                # Bones deleted in edit mode take their constraints with them, drop the resolved references
+                runtimes.pop(obj.name, None)
+                continue
+            if obj.data.ap_state.editing or not obj.data.ap_manifest:
+                continue
+            apply_runtime(obj, get_runtime(obj), depsgraph)
+    finally:
+        updating = False
+
+def register():
+    bpy.app.handlers.frame_change_post.append(runtime_handler)
+    bpy.app.handlers.depsgraph_update_post.append(runtime_handler)
+    bpy.app.handlers.load_post.append(clear_runtime)
+    bpy.app.handlers.undo_post.append(clear_runtime)
+    bpy.app.handlers.redo_post.append(clear_runtime)
+
+def unregister():
+    bpy.app.handlers.frame_change_post.remove(runtime_handler)
+    bpy.app.handlers.depsgraph_update_post.remove(runtime_handler)
+    bpy.app.handlers.load_post.remove(clear_runtime)
+    bpy.app.handlers.undo_post.remove(clear_runtime)
+    bpy.app.handlers.redo_post.remove(clear_runtime)
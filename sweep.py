@@ -0,0 +1,102 @@
+"""Headless range of motion test for Action Poser rigs.
+
+Sweeps every built pose of the armatures in a .blend file over its input range and checks the evaluated pose
+influences and constraint eval_time values against the expected mapping. Rigs are built first unless --no-build is given.
+
+    blender -b rig.blend --python sweep.py -- --armatures RIG --samples 5 --report sweep.json
+
+Poses whose inputs don't overlap are swept in the same frames, so a full rig check takes a handful of evaluations
+per pose channel instead of one sweep per pose. Blender exits with code 1 when any pose fails.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from batch import enable_addon
+
+
+def parse_args(argv: list) -> argparse.Namespace:
+    """Parses the arguments given after Blender's -- separator."""
+    if '--' in argv:
+        argv = argv[argv.index('--') + 1:]
+    else:
+        argv = []
+
+    parser = argparse.ArgumentParser(prog='sweep.py', description='Check that every Action Poser pose activates over its input range.')
+    parser.add_argument('--armatures', nargs='*', default=[], help='Armature object names to test. Defaults to every armature with poses')
+    parser.add_argument('--samples', type=int, default=5, help='Steps from min to max per pose')
+    parser.add_argument('--tolerance', type=float, default=0.0001, help='Largest difference that still passes')
+    parser.add_argument('--no-build', action='store_true', help='Test the rigs as saved instead of rebuilding them first')
+    parser.add_argument('--report', default='ap_sweep_report.json', help='Where to write the JSON report')
+
+    return parser.parse_args(argv)
+
+
+def sweep_armature(obj, args: argparse.Namespace) -> dict:
+    """Builds and sweeps one armature object. Returns the range test report or an error entry."""
+    import bpy
+
+    try:
+        if bpy.context.mode != 'OBJECT':
+            bpy.ops.object.mode_set(mode='OBJECT')
+        bpy.context.view_layer.objects.active = obj
+        bpy.ops.object.mode_set(mode='POSE')
+        if not args.no_build:
+            bpy.ops.armature.ap_execute()
+        if not obj.data.ap_manifest:
+            return {'armature': obj.name, 'error': 'Nothing built'}
+        bpy.ops.armature.ap_sweep_test(samples=args.samples, tolerance=args.tolerance)
+        bpy.ops.object.mode_set(mode='OBJECT')
+    except Exception as error:
+        return {'armature': obj.name, 'error': str(error)}
+
+    report = json.loads(bpy.data.texts['AP Sweep Report'].as_string())
+    report['error'] = ''
+    return report
+
+
+def run(args: argparse.Namespace) -> dict:
+    """Tests the armatures of the open file and returns the summary."""
+    import bpy
+
+    enable_addon()
+    start = time.perf_counter()
+
+    results = []
+    if args.armatures:
+        objects = []
+        for name in args.armatures:
+            obj = bpy.data.objects.get(name)
+            if obj and obj.type == 'ARMATURE':
+                objects.append(obj)
+            else:
+                results.append({'armature': name, 'error': 'Armature not found'})
+    else:
+        objects = [obj for obj in bpy.context.view_layer.objects if obj.type == 'ARMATURE' and obj.data.ap_poses]
+
+    for obj in objects:
+        results.append(sweep_armature(obj, args))
+
+    failed = [result['armature'] for result in results if result['error'] or result['failed']]
+    return {
+        'file': bpy.data.filepath,
+        'armatures': len(results),
+        'failed': failed,
+        'time': time.perf_counter() - start,
+        'results': results,
+    }
+
+
+if __name__ == '__main__':
+    ARGS = parse_args(sys.argv)
+    SUMMARY = run(ARGS)
+
+    with open(ARGS.report, 'w') as file:
+        json.dump(SUMMARY, file, indent=2)
+
+    mismatches = sum(len(result.get('mismatches', [])) for result in SUMMARY['results'])
+    print('Action Poser sweep: %d armatures, %d failed, %d mismatches, %.1fs. Report: %s' %(SUMMARY['armatures'], len(SUMMARY['failed']), mismatches, SUMMARY['time'], ARGS.report))
+    sys.exit(1 if SUMMARY['failed'] else 0)
@@ -0,0 +1,150 @@
+"""Symmetry naming engine.
+
+Side conventions come from the left/right suffix preferences plus the symmetry conventions string:
+comma separated left/right pairs where * stands for the rest of the name, e.g. "*_l/*_r, Left*/Right*, *_L_*/*_R_*".
+A * at the start makes a suffix, at the end a prefix and on both ends an infix.
+
+Opposite names are resolved through bidirectional indexes built once per collection. They are rebuilt when the
+collection size or the conventions change, and dropped when names are renamed through the UI, on undo and file load.
+"""
+import bpy
+from bpy.app.handlers import persistent
+
+indexes = {}
+owner = object()
+
+def parse_conventions(left_suffix: str, right_suffix: str, conventions: str) -> list:
+    """Returns (kind, left, right) rules. kind is SUFFIX, PREFIX or INFIX."""
+    rules = []
+    if left_suffix and right_suffix:
+        rules.append(('SUFFIX', left_suffix, right_suffix))
+
+    for pair in conventions.split(','):
+        sides = [side.strip() for side in pair.split('/')]
+        if len(sides) != 2:
+            continue
+        left, right = sides
+        if left.startswith('*') and left.endswith('*') and right.startswith('*') and right.endswith('*'):
+            kind = 'INFIX'
+        elif left.startswith('*') and right.startswith('*'):
+            kind = 'SUFFIX'
+        elif left.endswith('*') and right.endswith('*'):
+            kind = 'PREFIX'
+        else:
+            continue
+        left, right = left.strip('*'), right.strip('*')
+        if left and right and left != right:
+            rules.append((kind, left, right))
+
+    return rules
+
+def current_rules() -> tuple:
+    """Returns the rules of the scene preferences and a key that changes with them."""
+    prefs = bpy.context.scene.ap_preferences
+    key = (prefs.left_suffix, prefs.right_suffix, prefs.symmetry_conventions)
+    cached = indexes.get('rules')
+    if cached is None or cached[0] != key:
+        cached = indexes['rules'] = (key, parse_conventions(*key))
+    return cached[1], key
+
+def swap_name(name: str, rules: list=None) -> str:
+    """Returns the name with its side swapped by the first matching rule, or the name itself."""
+    if rules is None:
+        rules = current_rules()[0]
+
+    for kind, left, right in rules:
+        for this, other in ((left, right), (right, left)):
+            if kind == 'SUFFIX' and name.endswith(this):
+                return name[:-len(this)] + other
+            if kind == 'PREFIX' and name.startswith(this):
+                return other + name[len(this):]
+            if kind == 'INFIX' and this in name:
+                return name.replace(this, other, 1)
+
+    return name
+
+def name_side(name: str, rules: list=None) -> str:
+    """Returns LEFT or RIGHT for the side the first matching rule gives the name, or an empty string."""
+    if rules is None:
+        rules = current_rules()[0]
+
+    for kind, left, right in rules:
+        for this, side in ((left, 'LEFT'), (right, 'RIGHT')):
+            if kind == 'SUFFIX' and name.endswith(this):
+                return side
+            if kind == 'PREFIX' and name.startswith(this):
+                return side
+            if kind == 'INFIX' and this in name:
+                return side
+
+    return ''
+
+def opposite_index(kind: str, owner_name: str, names) -> dict:
+    """Returns a cached map from every name with an existing opposite to that opposite, in both directions.
+        names is only iterated when the index needs rebuilding.
+    """
+    rules, rules_key = current_rules()
+    key = (kind, owner_name)
+    signature = (len(names), rules_key)
+
+    cached = indexes.get(key)
+    if cached is not None and cached[0] == signature:
+        return cached[1]
+
+    existing = set(names.keys())
+    index = {}
+    for name in existing:
+        if name in index:
+            continue
+        opposite = swap_name(name, rules)
+        if opposite != name and opposite in existing:
+            index[name] = opposite
+            index[opposite] = name
+
+    indexes[key] = (signature, index)
+    return index
+
+def bone_index(armature: bpy.types.Armature) -> dict:
+    """Returns the opposite bone index of an armature."""
+    return opposite_index('bones', armature.name, armature.bones)
+
+def pose_index(armature: bpy.types.Armature) -> dict:
+    """Returns the opposite pose index of an armature."""
+    return opposite_index('poses', armature.name, armature.ap_poses)
+
+def object_index() -> dict:
+    """Returns the opposite object index of the file."""
+    return opposite_index('objects', '', bpy.data.objects)
+
+def action_index() -> dict:
+    """Returns the opposite action index of the file."""
+    return opposite_index('actions', '', bpy.data.actions)
+
+@persistent
+def invalidate(*args) -> None:
+    """Drops all indexes. Python renames don't notify the message bus, call this after renaming from scripts."""
+    indexes.clear()
+
+@persistent
+def invalidate_on_load(*args) -> None:
+    """Drops the indexes and renews the message bus subscriptions, which file loads clear."""
+    indexes.clear()
+    subscribe()
+
+def subscribe() -> None:
+    """Drops the indexes whenever bones, objects or actions get renamed in the UI."""
+    bpy.msgbus.clear_by_owner(owner)
+    for cls in (bpy.types.Bone, bpy.types.EditBone, bpy.types.Object, bpy.types.Action):
+        bpy.msgbus.subscribe_rna(key=(cls, 'name'), owner=owner, args=(), notify=invalidate)
+
+def register():
+    subscribe()
+    bpy.app.handlers.load_post.append(invalidate_on_load)
+    bpy.app.handlers.undo_post.append(invalidate)
+    bpy.app.handlers.redo_post.append(invalidate)
+
+def unregister():
+    bpy.msgbus.clear_by_owner(owner)
+    bpy.app.handlers.load_post.remove(invalidate_on_load)
+    bpy.app.handlers.undo_post.remove(invalidate)
+    bpy.app.handlers.redo_post.remove(invalidate)
@@ -0,0 +1,80 @@
+"""Loads the add-on modules for the tests without Blender.
+
+The repository root is the add-on package, and its __init__ needs bpy. The folder is registered as a bare package
+under the name pytest gives it, so pytest reuses it instead of running __init__, and the tests import single
+modules from it with load(). Outside Blender, bpy and mathutils are replaced by stand-ins that only cover what the
+modules touch while being imported. Tests only call functions that don't use Blender data.
+
+    python -m pytest
+"""
+import importlib
+import importlib.util
+import os
+import sys
+import types
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PACKAGE = os.path.basename(ROOT)
+
+class StandInTypes(types.ModuleType):
+    """bpy.types where every type is an empty class, so add-on classes can subclass them."""
+    def __getattr__(self, name: str) -> type:
+        if name.startswith('__'):
+            raise AttributeError(name)
+        cls = type(name, (), {})
+        setattr(self, name, cls)
+        return cls
+
+class StandInProps(types.ModuleType):
+    """bpy.props where every property function returns None."""
+    def __getattr__(self, name: str):
+        if name.startswith('__'):
+            raise AttributeError(name)
+        return lambda *args, **kwargs: None
+
+def stand_in_blender() -> None:
+    """Installs the bpy and mathutils stand-ins unless the real modules can be imported."""
+    try:
+        import bpy
+        return
+    except ImportError:
+        pass
+
+    bpy = types.ModuleType('bpy')
+    bpy.types = StandInTypes('bpy.types')
+    bpy.props = StandInProps('bpy.props')
+    bpy.app = types.ModuleType('bpy.app')
+    bpy.app.handlers = types.ModuleType('bpy.app.handlers')
+    bpy.app.handlers.persistent = lambda function: function
+    bpy.utils = types.ModuleType('bpy.utils')
+    bpy.utils.register_classes_factory = lambda classes: (lambda: None, lambda: None)
+    bpy_extras = types.ModuleType('bpy_extras')
+    bpy_extras.io_utils = types.ModuleType('bpy_extras.io_utils')
+    bpy_extras.io_utils.ExportHelper = type('ExportHelper', (), {})
+    bpy_extras.io_utils.ImportHelper = type('ImportHelper', (), {})
+    mathutils = StandInTypes('mathutils')
+
+    for module in (bpy, bpy.types, bpy.props, bpy.app, bpy.app.handlers, bpy.utils, bpy_extras, bpy_extras.io_utils, mathutils):
+        sys.modules[module.__name__] = module
+
+def register_package() -> None:
+    """Registers the add-on folder as a package without running its __init__."""
+    if PACKAGE not in sys.modules:
+        package = types.ModuleType(PACKAGE)
+        package.__path__ = [ROOT]
+        sys.modules[PACKAGE] = package
+
+def load(module: str):
+    """Imports an add-on module from the bare package."""
+    register_package()
+    return importlib.import_module(PACKAGE + '.' + module)
+
+def load_file(module: str):
+    """Imports an add-on file as a plain module outside the package, the way standalone files are used."""
+    spec = importlib.util.spec_from_file_location(module, os.path.join(ROOT, module + '.py'))
+    loaded = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(loaded)
+    return loaded
+
+stand_in_blender()
+register_package()
@@ -0,0 +1,71 @@
+"""Round trip of baked files through bake.py and bake_reader.py, checked against the reference evaluator."""
+import os
+
+import numpy as np
+
+from conftest import load
+
+bake = load('bake')
+bake_reader = load('bake_reader')
+evaluator = load('evaluator')
+
+def bone(name: str, frames: int=3) -> dict:
+    """Returns a sampled bone that moves along X over the pose range."""
+    location = np.zeros((frames, 3))
+    location[:, 0] = np.linspace(0.0, 1.0, frames)
+    return {
+        'name': name,
+        'influence': 1.0,
+        'location': location,
+        'rotation_quaternion': np.tile([1.0, 0.0, 0.0, 0.0], (frames, 1)),
+        'scale': np.ones((frames, 3)),
+    }
+
+def input_spec(index: int, bone_target: str) -> dict:
+    spec = {'target': 'RIG', 'bone_target': bone_target, 'transform_type': 'LOC_X', 'transform_space': 'LOCAL_SPACE', 'index': index}
+    spec['name'] = evaluator.input_name(spec)
+    return spec
+
+def make_setup() -> dict:
+    """Two inputs, a regular pose, a combo of both inputs and a trailing combo without any terms."""
+    return {
+        'inputs': [input_spec(0, 'DRV-A'), input_spec(1, 'DRV-B')],
+        'poses': [
+            {'name': 'A', 'type': 'POSE', 'mix': 'BEFORE_FULL', 'combo': [], 'terms': [(0, 1.0, 0.0)], 'bones': [bone('DEF-A')]},
+            {'name': 'AB', 'type': 'COMBO', 'mix': 'BEFORE_FULL', 'combo': ['A', 'B'], 'terms': [(0, 1.0, 0.0), (1, 1.0, 0.0)], 'bones': [bone('DEF-AB')]},
+            {'name': 'Empty', 'type': 'COMBO', 'mix': 'BEFORE_FULL', 'combo': ['', ''], 'terms': [], 'bones': []},
+        ],
+    }
+
+def write_and_load(setup: dict, tmp_path):
+    path = str(tmp_path / 'rig.apbk')
+    size = bake.write_baked(path, bake.bake_setup(setup))
+    assert size == os.path.getsize(path)
+    return bake_reader.load(path)
+
+def test_influences_match_evaluator(tmp_path):
+    setup = make_setup()
+    baked = write_and_load(setup, tmp_path)
+    values = np.array([[0.9, 0.2], [0.0, 1.0], [0.5, 0.5], [1.5, -0.5], [0.3, 0.8]])
+
+    expected = evaluator.evaluate_influences(setup, values)
+    actual = baked.influences(values)
+
+    np.testing.assert_allclose(actual, expected, atol=1e-6)
+    # The combo takes the smaller input even though the pose after it has no terms
+    assert abs(actual[0, 1] - 0.2) < 1e-6
+    assert np.all(actual[:, 2] == 0.0)
+
+def test_strings_and_samples_round_trip(tmp_path):
+    setup = make_setup()
+    baked = write_and_load(setup, tmp_path)
+
+    assert [baked.string(pose['name']) for pose in baked.poses] == ['A', 'AB', 'Empty']
+    assert baked.pose_index('AB') == 1
+    assert baked.pose_index('Missing') == -1
+
+    bones = baked.pose_bones(1)
+    assert len(bones) == 1
+    assert baked.string(bones[0]['name']) == 'DEF-AB'
+    samples = baked.bone_samples(int(baked.poses[1]['bone_start']))
+    np.testing.assert_allclose(samples[:, 0], np.linspace(0.0, 1.0, 3), atol=1e-6)
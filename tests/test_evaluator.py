@@ -0,0 +1,60 @@
+"""The reference evaluator imported as a plain module, the way it is used outside Blender."""
+import numpy as np
+
+from conftest import load_file
+
+evaluator = load_file('evaluator')
+
+def make_setup() -> dict:
+    inputs = [{'target': 'RIG', 'data_path': '["a"]', 'index': 0}, {'target': 'RIG', 'data_path': '["b"]', 'index': 1}]
+    for spec in inputs:
+        spec['name'] = evaluator.input_name(spec)
+    return {
+        'inputs': inputs,
+        'poses': [
+            {'name': 'A', 'terms': [(0, 2.0, 0.0)], 'bones': []},
+            {'name': 'AB', 'terms': [(0, 1.0, 0.0), (1, 1.0, 0.0)], 'bones': []},
+            {'name': 'Empty', 'terms': [], 'bones': []},
+        ],
+    }
+
+def test_influences():
+    values = np.array([[0.25, 0.8], [0.9, 0.2], [-1.0, 2.0]])
+    influences = evaluator.evaluate_influences(make_setup(), values)
+
+    np.testing.assert_allclose(influences, [[0.5, 0.25, 0.0], [1.0, 0.2, 0.0], [0.0, 0.0, 0.0]])
+
+def test_save_and_load(tmp_path):
+    setup = make_setup()
+    path = str(tmp_path / 'rig.npz')
+    evaluator.save_setup(setup, path)
+    loaded = evaluator.load_setup(path)
+
+    values = np.array([[0.3, 0.6]])
+    np.testing.assert_allclose(evaluator.evaluate_influences(loaded, values), evaluator.evaluate_influences(setup, values))
+
+def rotation_matrices(quaternion: np.ndarray) -> np.ndarray:
+    return evaluator.compose_matrices(np.zeros((len(quaternion), 3)), quaternion, np.ones((len(quaternion), 3)))
+
+def test_euler_channels_follow_the_rotation_order():
+    euler = np.array([[0.3, -0.5, 0.9]])
+    matrices = rotation_matrices(evaluator.euler_to_quaternion(euler, 'ZXY'))
+    values = evaluator.matrix_channels(np.repeat(matrices, 3, axis=0), ['ROT_X', 'ROT_Y', 'ROT_Z'], ['ZXY'] * 3)
+
+    np.testing.assert_allclose(values, euler[0], atol=1e-9)
+    assert evaluator.auto_rot_mode('YZX') == 'YZX'
+    assert evaluator.auto_rot_mode('QUATERNION') == 'XYZ'
+    assert evaluator.auto_rot_mode('AXIS_ANGLE') == 'XYZ'
+
+def test_swing_twist_channels():
+    swing = np.array([[np.cos(0.2), np.sin(0.2), 0.0, 0.0]])
+    twist = np.array([[np.cos(0.3), 0.0, np.sin(0.3), 0.0]])
+    quaternion = evaluator.multiply_quaternions(swing, twist)
+
+    # A swing of 0.4 around X after a twist of 0.6 around Y
+    np.testing.assert_allclose(evaluator.swing_twist(quaternion, 'Y'), [[0.4, 0.4, 0.6, 0.0]], atol=1e-9)
+    np.testing.assert_allclose(evaluator.swing_twist(-twist, 'Y'), [[0.0, 0.0, 0.6, 0.0]], atol=1e-9)
+
+    matrices = np.repeat(rotation_matrices(quaternion), 2, axis=0)
+    values = evaluator.matrix_channels(matrices, ['ROT_Y', 'ROT_W'], ['SWING_TWIST_Y'] * 2)
+    np.testing.assert_allclose(values, [0.6, 0.4], atol=1e-9)
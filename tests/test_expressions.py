@@ -0,0 +1,46 @@
+"""Driver expression folding and the simple expression check."""
+import math
+
+from conftest import load
+
+expressions = load('expressions')
+
+def evaluate(expression: str, **variables) -> float:
+    return eval(expression, {'min': min}, variables)
+
+def test_fold_range_maps_onto_zero_to_one():
+    scale, offset = expressions.fold_range(-2.0, 6.0)
+    assert -2.0 * scale + offset == 0.0
+    assert 6.0 * scale + offset == 1.0
+
+    scale, offset = expressions.fold_range(0.0, 90.0, rotation=True)
+    assert math.isclose(math.radians(90.0) * scale + offset, 1.0)
+
+    assert expressions.fold_range(1.0, 1.0) == (0.0, 0.0)
+
+def test_compiled_terms():
+    assert expressions.compile_term('a', 1.0, 0.0) == 'a'
+    assert expressions.compile_term('a', 0.5, -0.25) == 'a*0.5 - 0.25'
+    assert expressions.compile_term('a', 0.0, 0.0) == '0.0'
+    assert expressions.compile_expression([]) == '0.0'
+    assert expressions.compile_expression([('a', 2.0, 1.0), ('b', 1.0, 0.0)]) == 'min(a*2.0 + 1.0, b)'
+
+def test_compiled_expression_matches_folded_range():
+    scale_a, offset_a = expressions.fold_range(0.2, 0.7)
+    scale_b, offset_b = expressions.fold_range(-1.0, 0.0)
+    expression = expressions.compile_expression([('a', scale_a, offset_a), ('b', scale_b, offset_b)])
+
+    for a, b in ((0.2, -1.0), (0.45, -0.1), (0.7, 0.0)):
+        expected = min((a - 0.2) / 0.5, b + 1.0)
+        assert math.isclose(evaluate(expression, a=a, b=b), expected, abs_tol=1e-9)
+
+def test_compiled_expressions_take_the_fast_path():
+    expression = expressions.compile_expression([('a', 0.5, -0.25), ('b', 3.0, 0.0)])
+    assert expressions.is_simple_expression(expression, {'a', 'b'})
+    assert expressions.is_simple_expression('clamp(a * pi, 0, 1)', {'a'})
+
+    assert not expressions.is_simple_expression('a', {'b'})
+    assert not expressions.is_simple_expression('a.x', {'a'})
+    assert not expressions.is_simple_expression('min(a, key=b)', {'a', 'b'})
+    assert not expressions.is_simple_expression('"a"')
+    assert not expressions.is_simple_expression('a +')
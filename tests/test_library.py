@@ -0,0 +1,91 @@
+"""Pose libraries written and read back, in both formats."""
+from types import SimpleNamespace
+
+import pytest
+
+from conftest import load
+
+library = load('library')
+
+FIELDS = [('name', 'STRING'), ('build', 'BOOLEAN'), ('start_frame', 'INT'), ('transform_max', 'FLOAT'), ('type', 'ENUM')]
+RNA_TYPES = {'build': 'BOOLEAN', 'start_frame': 'INT', 'end_frame': 'INT', 'transform_min': 'FLOAT', 'transform_max': 'FLOAT'}
+
+class ID(library.bpy.types.ID):
+    """An object or action, referenced by name in the library."""
+    def __init__(self, name: str):
+        self.name = name
+
+def make_pose(name: str, target: str) -> SimpleNamespace:
+    pose = SimpleNamespace(name=name, build=True, type='POSE', target_type='BONE', target=ID(target), bone='DRV', data_path='',
+                           channel='LOC_X', mix='BEFORE_FULL', space='LOCAL_SPACE', rot_mode='AUTO', transform_min=0.0,
+                           transform_max=1.0, action=ID('AP-' + name), start_frame=0, end_frame=10, corr_pose_A='', corr_pose_B='')
+    pose.bones = [SimpleNamespace(bone='DEF-' + name, influence=0.5)]
+    pose.bl_rna = SimpleNamespace(properties={prop: SimpleNamespace(type=RNA_TYPES.get(prop, 'STRING')) for prop in library.PROPERTIES})
+    return pose
+
+def make_rig() -> SimpleNamespace:
+    """A duplicated rig: the object and its armature data have different names."""
+    return SimpleNamespace(name='Rig', data=SimpleNamespace(name='Armature.001', ap_poses=[make_pose('Smile', 'Rig')]))
+
+def test_header_names_the_object(tmp_path):
+    obj = make_rig()
+    path = str(tmp_path / 'poses.json')
+    assert library.write_library(path, obj, obj.data.ap_poses) == 1
+
+    records = library.read_library(path)
+    header = next(records)
+    poses = list(records)
+
+    # Imports remap targets that match the header, so it has to hold the object name the poses point at
+    assert header['armature'] == 'Rig'
+    assert poses[0]['target'] == header['armature']
+    assert poses[0]['bones'] == [['DEF-Smile', 0.5]]
+
+def test_check_rejects_a_malformed_record(tmp_path):
+    obj = make_rig()
+    path = str(tmp_path / 'poses.json')
+    library.write_library(path, obj, obj.data.ap_poses)
+    assert library.check_library(path)['armature'] == 'Rig'
+
+    with open(path, 'a') as file:
+        file.write('{"name": "Broken", "bones": [["DEF", "x"]]}\n')
+    with pytest.raises(ValueError, match='record 2'):
+        library.check_library(path)
+
+BROKEN_HEADERS = {
+    'truncated size': b'\x40\x00',
+    'truncated header': library.pack_blob(b'{"format": "ActionPoser"')[:-4],
+    'no fields': library.pack_blob(b'{"format": "ActionPoser", "version": 1}'),
+    'bad fields': library.pack_blob(b'{"format": "ActionPoser", "version": 1, "fields": ["name"]}'),
+}
+
+@pytest.mark.parametrize('header', BROKEN_HEADERS.values(), ids=BROKEN_HEADERS.keys())
+def test_broken_binary_headers_raise_value_error(tmp_path, header):
+    path = str(tmp_path / 'poses.apl')
+    with open(path, 'wb') as file:
+        file.write(library.MAGIC + header)
+
+    records = library.read_library(path)
+    with pytest.raises(ValueError):
+        next(records)
+        next(records)
+
+def test_binary_record_round_trip():
+    data = {'name': 'Brow \u00e9', 'build': False, 'start_frame': -3, 'transform_max': 0.125, 'type': 'COMBO', 'bones': [['DEF-a', 0.5], ['DEF-b', 1.0]]}
+    record = library.encode_pose(data, FIELDS)
+
+    assert library.decode_pose(record, FIELDS) == data
+
+def test_library_round_trip_in_both_formats(tmp_path):
+    obj = make_rig()
+    obj.data.ap_poses.append(make_pose('Frown', 'Other'))
+    expected = [library.pose_to_dict(pose) for pose in obj.data.ap_poses]
+
+    for name, binary in (('poses.json', False), ('poses.apl', True)):
+        path = str(tmp_path / name)
+        assert library.write_library(path, obj, obj.data.ap_poses, binary) == 2
+
+        records = library.read_library(path)
+        header = next(records)
+        assert header['armature'] == 'Rig'
+        assert list(records) == expected
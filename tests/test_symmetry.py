@@ -0,0 +1,37 @@
+"""Side convention parsing and name swapping."""
+from conftest import load
+
+symmetry = load('symmetry')
+
+RULES = symmetry.parse_conventions('.L', '.R', '*_l/*_r, Left*/Right*, *_L_*/*_R_*')
+
+def test_parse_conventions():
+    assert RULES == [
+        ('SUFFIX', '.L', '.R'),
+        ('SUFFIX', '_l', '_r'),
+        ('PREFIX', 'Left', 'Right'),
+        ('INFIX', '_L_', '_R_'),
+    ]
+
+def test_invalid_conventions_are_skipped():
+    rules = symmetry.parse_conventions('', '.R', 'a/b, *_l, *_x/*_x, Left*/*Right, */*')
+    assert rules == []
+
+def test_swap_name():
+    assert symmetry.swap_name('hand.L', RULES) == 'hand.R'
+    assert symmetry.swap_name('hand.R', RULES) == 'hand.L'
+    assert symmetry.swap_name('arm_l', RULES) == 'arm_r'
+    assert symmetry.swap_name('LeftEye', RULES) == 'RightEye'
+    assert symmetry.swap_name('lip_R_corner', RULES) == 'lip_L_corner'
+    assert symmetry.swap_name('spine', RULES) == 'spine'
+
+def test_first_matching_rule_wins():
+    # The suffix rule comes first, so only the suffix side is swapped
+    assert symmetry.swap_name('Left_arm.R', RULES) == 'Left_arm.L'
+    assert symmetry.name_side('Left_arm.R', RULES) == 'RIGHT'
+
+def test_name_side():
+    assert symmetry.name_side('hand.L', RULES) == 'LEFT'
+    assert symmetry.name_side('RightEye', RULES) == 'RIGHT'
+    assert symmetry.name_side('lip_L_corner', RULES) == 'LEFT'
+    assert symmetry.name_side('spine', RULES) == ''
@@ -0,0 +1,32 @@
+"""Ordering of collection slots, as used to restore the pose order of constraints."""
+import random
+
+from conftest import load
+
+utilities = load('utilities')
+
+class Collection(list):
+    """A list with the move() of Blender collections: the item is taken out and inserted at the new index."""
+    def move(self, source: int, target: int) -> None:
+        self.insert(target, self.pop(source))
+
+def test_sort_slots_keeps_other_items_in_place():
+    collection = Collection(['c', 'x', 'a', 'y', 'b'])
+    slots = [0, 2, 4]
+    utilities.sort_slots(collection, slots, [collection[i] for i in slots])
+
+    assert collection == ['a', 'x', 'b', 'y', 'c']
+
+def test_sort_slots_random_orders():
+    rng = random.Random(7)
+    for case in range(200):
+        size = rng.randint(1, 12)
+        collection = Collection(rng.sample(range(100), size))
+        slots = sorted(rng.sample(range(size), rng.randint(0, size)))
+        others = {i: collection[i] for i in range(size) if i not in slots}
+        expected = sorted(collection[i] for i in slots)
+
+        utilities.sort_slots(collection, slots, [collection[i] for i in slots])
+
+        assert [collection[i] for i in slots] == expected
+        assert all(collection[i] == item for i, item in others.items())
@@ -1,7 +1,8 @@
 import bpy
+import fnmatch
 from bpy.types import Context, Panel, UIList
 
-from . utilities import is_valid_path
+from . utilities import is_valid_path, list_cache, list_revision
 
 class ActionPoserPanel(Panel):
     bl_space_type = 'VIEW_3D'
@@ -48,9 +49,34 @@ class VIEW3D_PT_action_poses(ActionPoserPanel):
         col.menu("VIEW3D_MT_poses_menu", icon='DOWNARROW_HLT', text="")
 
         row = layout.split(factor=0.8)
-        row.operator('armature.ap_execute', icon='PLAY')
+        sub = row.row(align=True)
+        sub.operator('armature.ap_execute', icon='PLAY')
+        sub.operator('armature.ap_execute', icon='FILE_REFRESH', text='').incremental = True
         row.operator('armature.ap_purge', icon='X')
 
+        stats = armature.ap_build_stats
+        if stats.report:
+            box = layout.box()
+            col = box.column(align=True)
+            row = col.row()
+            row.label(text='Last build: %.2fs' %(stats.total_time), icon='TIME')
+            row.operator('armature.ap_profile_costs', icon='SORTTIME', text='')
+            row.operator('armature.ap_sweep_test', icon='CHECKMARK', text='')
+            row.operator('armature.ap_build_report', icon='TEXT', text='')
+            col.label(text='%d poses, %d constraints, %d drivers' %(stats.poses, stats.constraints, stats.drivers))
+            if stats.rebuilt != stats.poses:
+                col.label(text='%d poses rebuilt' %(stats.rebuilt))
+            if stats.slowest:
+                col.separator()
+                for item in stats.slowest:
+                    row = col.row()
+                    row.label(text=item.name)
+                    row.label(text='%.1f ms' %(item.time * 1000.0))
+            if stats.costs:
+                col.separator()
+                col.label(text='Cost per frame:')
+                col.template_list("VIEW3D_UL_pose_costs", "", stats, "costs", stats, "costs_index", rows=5)
+
 
 class VIEW3D_PT_action_poser_driver(ActionPoserPanel):
     bl_label = "Driver"
@@ -209,12 +235,74 @@ class VIEW3D_PT_action_poser_prefs(ActionPoserPanel):
         col.prop(prefs, 'constraint_prefix')
         col.prop(prefs, 'left_suffix')
         col.prop(prefs, 'right_suffix')
+        col.prop(prefs, 'symmetry_conventions')
         col.prop(prefs, 'pose_prefix')
         col.prop(prefs, 'combo_prefix')
         col.prop(prefs, 'default_name')
+        col.prop(prefs, 'driver_mode')
+
+
+class CachedFilterList(UIList):
+    """UI list whose filter flags and order are cached until the list's armature changes.
+        Subclasses define FIELDS, a dict of field key to a function reading that field from an item.
+    """
+    FIELDS = {}
+
+    def draw_filter(self, context, layout):
+        row = layout.row(align=True)
+        row.prop(self, 'filter_name', text='')
+        row.prop(self, 'use_filter_invert', text='', icon='ARROW_LEFTRIGHT')
+        row.prop(self, 'filter_by', text='')
+
+        row = layout.row(align=True)
+        row.prop(self, 'use_filter_sort_alpha', text='', icon='SORTALPHA')
+        row.prop(self, 'use_filter_sort_reverse', text='', icon='SORT_DESC' if self.use_filter_sort_reverse else 'SORT_ASC')
+        row.prop(self, 'sort_by', text='')
+
+    def filter_items(self, context, data, propname):
+        items = getattr(data, propname)
+        armature = data.id_data
+        key = (type(self).__name__, self.list_id, armature.name, data.path_from_id(propname))
+        signature = (list_revision(armature), len(items), self.filter_name, self.filter_by,
+                     self.use_filter_sort_alpha, self.use_filter_sort_reverse, self.sort_by)
+
+        # Redraws reuse the result until the list or its filter settings change
+        cached = list_cache.get(key)
+        if cached and cached[0] == signature:
+            return cached[1], cached[2]
+
+        flt_flags = []
+        flt_neworder = []
+
+        if self.filter_name:
+            pattern = '*' + self.filter_name.lower() + '*'
+            read = self.FIELDS[self.filter_by]
+            flt_flags = [self.bitflag_filter_item if fnmatch.fnmatchcase(str(read(item)).lower(), pattern) else 0 for item in items]
+
+        if self.use_filter_sort_alpha:
+            read = self.FIELDS[self.sort_by]
+            values = [read(item) for item in items]
+            order = sorted(range(len(values)), key=values.__getitem__, reverse=self.use_filter_sort_reverse)
+            flt_neworder = [0] * len(order)
+            for position, index in enumerate(order):
+                flt_neworder[index] = position
+
+        list_cache[key] = (signature, flt_flags, flt_neworder)
+        return flt_flags, flt_neworder
 
 
-class VIEW3D_UL_actions_list(UIList):
+class VIEW3D_UL_actions_list(CachedFilterList):
+    FIELDS = {
+        'NAME': lambda item: item.name,
+        'TYPE': lambda item: item.type,
+        'TARGET': lambda item: item.bone if item.target_type == 'BONE' else item.data_path,
+        'ACTION': lambda item: item.action.name if item.action else '',
+    }
+    FIELD_ITEMS = (('NAME', 'Name', 'Pose name', 0), ('TYPE', 'Type', 'Pose or combo', 1), ('TARGET', 'Target', 'Target bone or path', 2), ('ACTION', 'Action', 'Action name', 3))
+
+    filter_by: bpy.props.EnumProperty(name='Filter By', description='Which setting the name filter matches', items=FIELD_ITEMS, default='NAME')
+    sort_by: bpy.props.EnumProperty(name='Sort By', description='Which setting the list is sorted by', items=FIELD_ITEMS, default='NAME')
+
     def draw_item(self, context, layout, data, item, icon, active_data, active_propname, index):
         layout.use_property_split = False
         
@@ -247,6 +335,16 @@ class VIEW3D_MT_poses_menu(bpy.types.Menu):
         layout.separator()
         layout.operator("armature.ap_copy", text = 'Copy All to Selected').mode = 'ALL'
         layout.operator("armature.ap_copy", text = 'Copy Active to Selected').mode = 'ACTIVE'
+        op = layout.operator("armature.ap_copy", text = 'Copy All to Selected and Build')
+        op.mode = 'ALL'
+        op.build = True
+        layout.separator()
+        layout.operator("armature.ap_pose_mirror_all", icon='MOD_MIRROR', text='Mirror Left Poses to Right').side = 'LEFT'
+        layout.operator("armature.ap_pose_mirror_all", icon='MOD_MIRROR', text='Mirror Right Poses to Left').side = 'RIGHT'
+        layout.separator()
+        layout.operator("armature.ap_export_library", icon='EXPORT')
+        layout.operator("armature.ap_import_library", icon='IMPORT')
+        layout.operator("armature.ap_export_baked", icon='EXPORT')
         layout.separator()
         layout.operator("armature.ap_clear")
 
@@ -274,6 +372,11 @@ class VIEW3D_MT_action_menu(bpy.types.Menu):
         layout.separator()
         layout.operator("armature.ap_action_rename", icon='FONT_DATA')
         layout.operator('armature.ap_remove_flat_curves', icon='NOCURVE').idx = armature.ap_poses_index
+        layout.operator('armature.ap_remove_flat_curves_all', icon='NOCURVE')
+        row = layout.row()
+        row.enabled = bool(armature.ap_poses and armature.ap_poses[armature.ap_poses_index].action)
+        row.operator('armature.ap_action_decimate', icon='IPO_BEZIER', text='Decimate Keys').mode = 'ACTIVE'
+        layout.operator('armature.ap_action_decimate', icon='IPO_BEZIER', text='Decimate Keys (All Poses)').mode = 'ALL'
         layout.separator()
         layout.operator("armature.ap_action_delete", icon='REMOVE').idx = armature.ap_poses_index
 
@@ -293,7 +396,15 @@ class VIEW3D_MT_bones_menu(bpy.types.Menu):
         layout.operator("armature.ap_bone_remove_all", icon='X').idx = armature.ap_poses_index
 
 
-class VIEW3D_UL_bones_list(UIList):
+class VIEW3D_UL_bones_list(CachedFilterList):
+    FIELDS = {
+        'NAME': lambda item: item.bone,
+        'INFLUENCE': lambda item: item.influence,
+    }
+
+    filter_by: bpy.props.EnumProperty(name='Filter By', description='Which setting the name filter matches', items=(('NAME', 'Bone', 'Bone name', 0),), default='NAME')
+    sort_by: bpy.props.EnumProperty(name='Sort By', description='Which setting the list is sorted by', items=(('NAME', 'Bone', 'Bone name', 0), ('INFLUENCE', 'Influence', 'Constraint influence', 1)), default='NAME')
+
     def draw_item(self, context, layout, data, item, icon, active_data, active_propname, index):
         layout.use_property_split = False
         
@@ -303,47 +414,29 @@ class VIEW3D_UL_bones_list(UIList):
         split = split.split(factor=0.15)
         split.label(text='')
         split.prop(item, "influence", emboss=True, text='', slider = True)
-
-    def filter_items(self, context, data, propname):
-        # This function gets the collection property (as the usual tuple (data, propname)), and must return two lists:
-        # * The first one is for filtering, it must contain 32bit integers were self.bitflag_filter_item marks the
-        #   matching item as filtered (i.e. to be shown), and 31 other bits are free for custom needs. Here we use the
-        #   first one to mark VGROUP_EMPTY.
-        # * The second one is for reordering, it must return a list containing the new indices of the items (which
-        #   gives us a mapping org_idx -> new_idx).
-        # Please note that the default UI_UL_list defines helper functions for common tasks (see its doc for more info).
-        # If you do not make filtering and/or ordering, return empty list(s) (this will be more efficient than
-        # returning full lists doing nothing!).
-        ap_bones = getattr(data, propname)
-        helper_funcs = bpy.types.UI_UL_list
         
-        # Default return values.
-        flt_flags = []
-        flt_neworder = []
-
-        # # Pre-compute of vgroups data, CPU-intensive. :/
-        # vgroups_empty = self.filter_items_empty_vgroups(context, vgroups)
 
-        # Filtering by name
-        if self.filter_name:
-            flt_flags = helper_funcs.filter_items_by_name(self.filter_name, self.bitflag_filter_item, ap_bones, "bone",
-                                                          reverse=self.use_filter_sort_reverse)
-        if not flt_flags:
-            flt_flags = [self.bitflag_filter_item] * len(ap_bones)
-
-        # Reorder by name.
-        if self.use_filter_sort_alpha:
-            sorted_names = [x.bone for x in ap_bones]
-            sorted_names.sort()
-            if self.use_filter_sort_reverse:
-                sorted_names.reverse()
-            for name in sorted_names:
-                flt_neworder.append(ap_bones[name])
+class VIEW3D_UL_pose_costs(CachedFilterList):
+    FIELDS = {
+        'NAME': lambda item: item.name,
+        'COST': lambda item: -item.cost,
+        'CONSTRAINTS': lambda item: -item.constraints,
+        'DRIVERS': lambda item: -item.drivers,
+    }
+
+    filter_by: bpy.props.EnumProperty(name='Filter By', description='Which setting the name filter matches', items=(('NAME', 'Pose', 'Pose name', 0),), default='NAME')
+    sort_by: bpy.props.EnumProperty(name='Sort By', description='Which setting the list is sorted by', items=(
+                                                                                                                    ('COST', 'Cost', 'Evaluation time per frame, highest first', 0),
+                                                                                                                    ('CONSTRAINTS', 'Constraints', 'Constraint count, highest first', 1),
+                                                                                                                    ('DRIVERS', 'Drivers', 'Driver count, highest first', 2),
+                                                                                                                    ('NAME', 'Pose', 'Pose name', 3)), default='COST')
 
-            # flt_neworder = helper_funcs.sort_items_helper(ap_bones, "bone", reverse=self.use_filter_sort_reverse)
+    def draw_item(self, context, layout, data, item, icon, active_data, active_propname, index):
+        row = layout.row()
+        row.label(text=item.name)
+        row.label(text='%.2f ms' %(item.cost * 1000.0))
+        row.label(text='%d / %d' %(item.constraints, item.drivers), icon='CONSTRAINT_BONE')
 
-        return flt_flags, flt_neworder
-        
 
 classes = [
     VIEW3D_MT_poses_menu,
@@ -353,6 +446,7 @@ classes = [
     VIEW3D_PT_action_poser,
     VIEW3D_UL_actions_list,
     VIEW3D_UL_bones_list,
+    VIEW3D_UL_pose_costs,
     VIEW3D_PT_action_poses,
     VIEW3D_PT_action_poser_driver,
     VIEW3D_PT_action_poser_action,
@@ -3,6 +3,8 @@ from . utilities import (find_opposite_bone_name,
                          find_opposite_object_name,
                          find_opposite_action_name, find_opposite_pose_name,
                          swap_side_suffix,
+                         bone_lookup,
+                         mark_lists_changed,
                          )
 
 class DATA_OT_ap_pose_remove(bpy.types.Operator):
@@ -26,6 +28,8 @@ class DATA_OT_ap_pose_remove(bpy.types.Operator):
 
         armature = context.active_object.data
         armature.ap_poses_index = 0 if self.idx == 0 else self.idx -1
+        # The poses after the removed one shift up, their bone list filters are keyed by position
+        mark_lists_changed(armature)
 
         return {'FINISHED'}
 
@@ -82,6 +86,7 @@ class DATA_OT_ap_pose_duplicate(bpy.types.Operator):
         armature = context.active_object.data
         armature.ap_poses.move(len(armature.ap_poses) - 1, self.idx+1)
         armature.ap_poses_index = self.idx+1
+        mark_lists_changed(armature)
 
         return {'FINISHED'}
 
@@ -110,17 +115,19 @@ class DATA_OT_ap_pose_mirror(bpy.types.Operator):
 
         new_pose.name = swap_side_suffix(new_pose.name)
 
-        opposite_target = find_opposite_object_name(new_pose.target)
-        if opposite_target:
-            new_pose.target = opposite_target
+        if new_pose.target:
+            opposite_target = find_opposite_object_name(new_pose.target.name)
+            if opposite_target:
+                new_pose.target = bpy.data.objects[opposite_target]
 
         opposite_bone = find_opposite_bone_name(new_pose.bone)
         if opposite_bone:
             new_pose.bone = opposite_bone
 
-        opposite_action = find_opposite_action_name(new_pose.action)
-        if opposite_action:
-            new_pose.bone = opposite_action
+        if new_pose.action:
+            opposite_action = find_opposite_action_name(new_pose.action.name)
+            if opposite_action:
+                new_pose.action = bpy.data.actions[opposite_action]
 
         if old_pose.bones:
             for bone in old_pose.bones:
@@ -143,6 +150,7 @@ class DATA_OT_ap_pose_mirror(bpy.types.Operator):
         armature = context.active_object.data
         armature.ap_poses.move(len(armature.ap_poses) - 1, self.idx+1)
         armature.ap_poses_index = self.idx+1
+        mark_lists_changed(armature)
 
         return {'FINISHED'}
 
@@ -183,6 +191,7 @@ class DATA_OT_ap_pose_move(bpy.types.Operator):
             armature.ap_poses.move(idx, len(armature.ap_poses)-1)
             armature.ap_poses_index = len(armature.ap_poses)-1
 
+        mark_lists_changed(armature)
 
         return {'FINISHED'}
 
@@ -204,6 +213,7 @@ class DATA_OT_ap_bone_add(bpy.types.Operator):
         bones.add()
 
         context.active_object.data.ap_bones_index = len(bones) - 1
+        mark_lists_changed(context.active_object.data)
 
         return {'FINISHED'}
 
@@ -224,6 +234,7 @@ class DATA_OT_ap_bone_remove(bpy.types.Operator):
         context.active_object.data.ap_poses[self.idx].bones.remove(self.bone_idx)
 
         context.active_object.data.ap_bones_index = 0 if self.bone_idx == 0 else self.bone_idx -1
+        mark_lists_changed(context.active_object.data)
 
         return {'FINISHED'}
 
@@ -245,11 +256,11 @@ class DATA_OT_ap_bone_add_selected(bpy.types.Operator):
         ap_bones = ap_pose.bones
         sel_bones = context.selected_pose_bones
 
+        bones_names = bone_lookup(ap_bones)
         for sel_bone in sel_bones:
-            if sel_bone.name not in [x.bone for x in ap_bones]:
-                ap_bones.add()
-                last_idx = len(ap_bones)
-                ap_bones[last_idx-1].bone = sel_bone.name
+            if sel_bone.name not in bones_names:
+                bones_names[sel_bone.name] = len(ap_bones)
+                ap_bones.add().bone = sel_bone.name
 
         context.active_object.data.ap_bones_index = len(ap_bones) - 1
 
@@ -273,13 +284,13 @@ class DATA_OT_ap_bone_remove_selected(bpy.types.Operator):
         ap_pose = armature.ap_poses[self.idx]
         ap_bones = ap_pose.bones
 
-        sel_bones = [x.name for x in context.selected_pose_bones]
+        sel_bones = {x.name for x in context.selected_pose_bones}
         
         if sel_bones:
-            for (i, bone) in sorted(enumerate(ap_bones), reverse=True):
-                if bone.bone in sel_bones:
+            for i in reversed(range(len(ap_bones))):
+                if ap_bones[i].bone in sel_bones:
                     ap_bones.remove(i)
-
+        mark_lists_changed(armature)
 
         return {'FINISHED'}
 
@@ -336,13 +347,12 @@ class DATA_OT_ap_bone_add_from_action(bpy.types.Operator):
         ap_bones = ap_pose.bones
         action = ap_pose.action
         groups = [x.name for x in action.groups] # Groups equals to bone names
-        bones_names = [x.bone for x in ap_bones]
+        bones_names = bone_lookup(ap_bones)
         if self.mode == 'ADD':
             for group in groups:
                 if group not in bones_names and group in armature.bones:
-                    ap_bones.add()
-                    last_idx = len(ap_bones)
-                    ap_bones[last_idx-1].bone = group
+                    bones_names[group] = len(ap_bones)
+                    ap_bones.add().bone = group
 
             context.active_object.data.ap_bones_index = len(ap_bones) - 1
             
@@ -370,6 +380,7 @@ class DATA_OT_ap_bone_remove_all(bpy.types.Operator):
 
     def execute(self, context):
         context.active_object.data.ap_poses[self.idx].bones.clear()
+        mark_lists_changed(context.active_object.data)
 
         return {'FINISHED'}
 
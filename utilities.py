@@ -1,4 +1,36 @@
 import bpy
+import hashlib
+import json
+import math
+import numpy as np
+from bpy.app.handlers import persistent
+from mathutils import Quaternion
+
+from . expressions import compile_expression, fold_range, is_simple_expression
+from . profiling import BuildProfile, driver_curves, pose_drivers
+from . symmetry import swap_name, bone_index, pose_index, object_index, action_index, invalidate
+
+path_cache = {}
+list_revisions = {}
+list_cache = {}
+list_owner = object()
+
+# Transform components that change sign when a pose is mirrored across X
+MIRROR_FLIPS = {
+    'location': (0,),
+    'rotation_euler': (1, 2),
+    'rotation_quaternion': (2, 3),
+    'rotation_axis_angle': (2, 3),
+}
+
+AXES = ((1.0, 0.0, 0.0), (0.0, 1.0, 0.0), (0.0, 0.0, 1.0))
+
+REST_TRANSFORMS = {
+    'location': (0.0, 0.0, 0.0),
+    'rotation_euler': (0.0, 0.0, 0.0),
+    'rotation_quaternion': (1.0, 0.0, 0.0, 0.0),
+    'scale': (1.0, 1.0, 1.0),
+}
 
 def poll_is_mesh_object(self,obj: bpy.types.Object) -> bool:
     """Checks if the object is a mesh object."""
@@ -15,13 +47,74 @@ def poll_is_armature_object(self,obj: bpy.types.Object) -> bool:
         return False
 
 def is_valid_path(pose: bpy.types.PropertyGroup) -> bool:
-    """Checks if the data path is valid."""
-    command = 'import bpy; bpy.data.objects["' + pose.target.name + '"].' + pose.data_path
+    """Checks if the data path is valid.
+        Results are cached per target and path, so panel redraws only cost a lookup.
+    """
+    if not pose.target:
+        return False
+
+    key = (pose.target.name, pose.data_path)
+    valid = path_cache.get(key)
+    if valid is None:
+        valid = resolve_path(pose.target, pose.data_path)
+        path_cache[key] = valid
+
+    return valid
+
+def resolve_path(target: bpy.types.ID, data_path: str) -> bool:
+    """Resolves the data path through RNA. Only single value properties can drive a pose."""
     try:
-        exec(command)
-    except:
+        value = target.path_resolve(data_path)
+    except (ValueError, TypeError):
         return False
-    return True
+
+    return isinstance(value, (bool, int, float))
+
+def update_pose_path(self, context: bpy.types.Context) -> None:
+    """Invalidates the cached path result when a pose's target or path changes."""
+    if self.target:
+        path_cache.pop((self.target.name, self.data_path), None)
+    mark_lists_changed(self.id_data)
+
+def update_pose_name(self, context: bpy.types.Context) -> None:
+    """Invalidates the symmetry indexes and the UI list caches when a pose gets renamed."""
+    invalidate()
+    mark_lists_changed(self.id_data)
+
+def update_list_revision(self, context: bpy.types.Context) -> None:
+    """Update callback for pose and bone settings that the UI lists filter or sort by."""
+    mark_lists_changed(self.id_data)
+
+def mark_lists_changed(armature: bpy.types.Armature) -> None:
+    """Bumps the change counter that the cached UI list filters of an armature are keyed on."""
+    list_revisions[armature.name] = list_revisions.get(armature.name, 0) + 1
+
+def list_revision(armature: bpy.types.Armature) -> int:
+    """Returns the change counter of an armature's pose and bone lists."""
+    return list_revisions.get(armature.name, 0)
+
+def clear_list_cache(*args) -> None:
+    """Drops the cached UI list filters. Lists sort and filter by action name, which no pose update reports.
+        Python renames don't notify the message bus, call this after renaming actions from scripts.
+    """
+    list_cache.clear()
+
+@persistent
+def clear_caches(*args) -> None:
+    """Drops all cached lookups. Runs after loading a file and after undo/redo."""
+    path_cache.clear()
+    list_cache.clear()
+
+@persistent
+def clear_caches_on_load(*args) -> None:
+    """Drops all cached lookups and renews the message bus subscription, which file loads clear."""
+    clear_caches()
+    subscribe_lists()
+
+def subscribe_lists() -> None:
+    """Drops the cached UI list filters whenever an action gets renamed in the UI."""
+    bpy.msgbus.clear_by_owner(list_owner)
+    bpy.msgbus.subscribe_rna(key=(bpy.types.Action, 'name'), owner=list_owner, args=(), notify=clear_list_cache)
 
 
 def is_valid_pose(pose: bpy.types.PropertyGroup) -> bool:
@@ -39,8 +132,62 @@ def is_valid_pose(pose: bpy.types.PropertyGroup) -> bool:
     return True
 
 
-def purge_poses() -> None:
-    """Cleanup function which removes all poses and drivers"""
+def pose_lookup(armature: bpy.types.Armature, cache: dict=None) -> dict:
+    """Returns a pose name to index map of the armature's poses.
+        Stored in cache, so a build or an operator that passes the same cache builds it only once.
+    """
+    # Pose names are strings, the tuple key can't collide with collect_inputs entries
+    key = ('poses', armature.name)
+    if cache is not None and key in cache:
+        return cache[key]
+
+    lookup = {pose.name: i for i, pose in enumerate(armature.ap_poses)}
+    if cache is not None:
+        cache[key] = lookup
+    return lookup
+
+def get_pose(armature: bpy.types.Armature, name: str, cache: dict=None) -> bpy.types.PropertyGroup:
+    """Returns a pose by name through the lookup table, None if there is no such pose."""
+    index = pose_lookup(armature, cache).get(name)
+    return armature.ap_poses[index] if index is not None else None
+
+def bone_lookup(ap_bones: bpy.types.bpy_prop_collection) -> dict:
+    """Returns a bone name to index map of a pose's bone list."""
+    return {ap_bone.bone: i for i, ap_bone in enumerate(ap_bones)}
+
+def purge_poses(keep: set=None) -> None:
+    """Cleanup function which removes all poses and drivers.
+        Constraint names listed in keep are left untouched.
+    """
+    context = bpy.context
+    obj = context.active_object
+    armature = obj.data
+    manifest = armature.ap_manifest
+    keep = keep or set()
+
+    if manifest:
+        for i in reversed(range(len(manifest))):
+            entry = manifest[i]
+            if entry.name in keep:
+                continue
+            remove_manifest_entry(obj, entry)
+            manifest.remove(i)
+    else:
+        purge_poses_by_prefix(keep)
+
+    for ap_pose in armature.ap_poses:
+        if context.scene.ap_preferences.constraint_prefix + ap_pose.name in keep:
+            continue
+        ap_pose.build_hash = ''
+        try:
+            ap_pose.driver_remove('influence')
+        except:
+            pass
+
+def purge_poses_by_prefix(keep: set) -> None:
+    """Scans the whole rig for constraints and drivers with the constraint prefix.
+        Fallback for rigs that were built before the manifest existed.
+    """
     context = bpy.context
     bones = context.active_object.pose.bones
     prefs = context.scene.ap_preferences
@@ -48,24 +195,124 @@ def purge_poses() -> None:
     anim_data = context.active_object.animation_data
     if anim_data:
         drivers = anim_data.drivers
-        for driver in drivers:
+        for driver in list(drivers):
             path = driver.data_path
             if "constraints[\"" + prefs.constraint_prefix in path:
-                drivers.remove(driver)
+                if path.split("constraints[\"")[1].split("\"]")[0] not in keep:
+                    drivers.remove(driver)
 
 
     for bone in bones:
         constraints = bone.constraints
 
-        for constraint in constraints:
-            if prefs.constraint_prefix in constraint.name:
+        for constraint in list(constraints):
+            if prefs.constraint_prefix in constraint.name and constraint.name not in keep:
                 bone.constraints.remove(constraint)
 
-    for ap_pose in context.active_object.data.ap_poses:
+def remove_manifest_entry(obj: bpy.types.Object, entry: bpy.types.PropertyGroup) -> None:
+    """Removes the constraints and drivers recorded in a manifest entry."""
+    pose_bones = obj.pose.bones
+
+    for bone in entry.bones:
+        pose_bone = pose_bones.get(bone.name)
+        if not pose_bone:
+            continue
+        constraint = pose_bone.constraints.get(entry.name)
+        if not constraint:
+            continue
         try:
-            ap_pose.driver_remove('influence')
+            constraint.driver_remove('eval_time')
         except:
             pass
+        pose_bone.constraints.remove(constraint)
+
+    anim_data = obj.data.animation_data
+    if anim_data:
+        for path in ('ap_poses["' + entry.pose + '"].influence', '["' + entry.name + '"]'):
+            driver = anim_data.drivers.find(path)
+            if driver:
+                anim_data.drivers.remove(driver)
+
+def restore_build_order(obj: bpy.types.Object, names: set) -> None:
+    """Puts the manifest, and the pose constraints on every bone of the named entries, back into pose order.
+        Incremental builds append rebuilt constraints at the end of each stack. Action constraints don't commute,
+        so the stack has to match what a full build creates. Other constraints keep their slots.
+    """
+    armature = obj.data
+    prefix = bpy.context.scene.ap_preferences.constraint_prefix
+    order = {prefix + pose.name: i for i, pose in enumerate(armature.ap_poses)}
+    manifest = armature.ap_manifest
+
+    sort_slots(manifest, list(range(len(manifest))), [order.get(entry.name, len(order)) for entry in manifest])
+
+    bones = {bone.name for entry in manifest if entry.name in names for bone in entry.bones}
+    for name in bones:
+        pose_bone = obj.pose.bones.get(name)
+        if not pose_bone:
+            continue
+        constraints = pose_bone.constraints
+        slots = [i for i, constraint in enumerate(constraints) if constraint.name in order]
+        sort_slots(constraints, slots, [order[constraints[i].name] for i in slots])
+
+def sort_slots(collection, slots: list, keys: list) -> None:
+    """Sorts the items at the given ascending positions of a collection by key. Items at other positions stay put."""
+    keys = list(keys)
+    for i in range(len(slots)):
+        best = min(range(i, len(slots)), key=keys.__getitem__)
+        if best != i:
+            # Two moves swap the items without shifting the ones between them
+            collection.move(slots[best], slots[i])
+            collection.move(slots[i] + 1, slots[best])
+            keys[i], keys[best] = keys[best], keys[i]
+
+def pose_fingerprint(pose: bpy.types.PropertyGroup, cache: dict=None) -> str:
+    """Returns a hash of every setting that affects how the pose gets built."""
+    prefs = bpy.context.scene.ap_preferences
+
+    variables = {}
+    collect_all_variables(pose, variables, cache)
+    inputs = []
+    for key in variables.keys():
+        inputs.append(sorted((k, v.name if isinstance(v, bpy.types.ID) else v) for k, v in variables[key].items()))
+
+    data = [
+        prefs.constraint_prefix,
+        pose.name,
+        pose.type,
+        pose.target_type,
+        pose.action.name if pose.action else '',
+        pose.start_frame,
+        pose.end_frame,
+        pose.mix,
+        prefs.driver_mode,
+        [(ap_bone.bone, ap_bone.influence) for ap_bone in pose.bones],
+        inputs,
+    ]
+
+    return hashlib.md5(repr(data).encode()).hexdigest()
+
+def store_build_stats(obj: bpy.types.Object, profile: BuildProfile) -> None:
+    """Stores the summary of a build profile on the armature for the Poses panel.
+        Counts are totals of the whole rig from the manifest, the profile only covers the poses that were rebuilt.
+    """
+    armature = obj.data
+    manifest = armature.ap_manifest
+    curves = driver_curves(obj)
+
+    stats = armature.ap_build_stats
+    stats.total_time = profile.total
+    stats.poses = len(manifest)
+    stats.rebuilt = profile.counts['poses']
+    stats.constraints = sum(len(entry.bones) for entry in manifest)
+    stats.drivers = sum(len(pose_drivers(entry, curves)) for entry in manifest)
+    stats.report = json.dumps(profile.report())
+    stats.driver_mode = bpy.context.scene.ap_preferences.driver_mode
+
+    stats.slowest.clear()
+    for name, seconds in profile.pose_times()[:5]:
+        item = stats.slowest.add()
+        item.name = name
+        item.time = seconds
 
 def influence_has_driver(pose: bpy.types.PropertyGroup) -> bool:
     """Checks if the pose has a driver on the influence property."""
@@ -85,6 +332,16 @@ def toggle_pose_constraints(value: bool) -> None:
     context = bpy.context
     bones = context.active_object.pose.bones
     prefs = context.scene.ap_preferences
+    manifest = context.active_object.data.ap_manifest
+
+    if manifest:
+        for entry in manifest:
+            for bone in entry.bones:
+                pose_bone = bones.get(bone.name)
+                constraint = pose_bone.constraints.get(entry.name) if pose_bone else None
+                if constraint:
+                    constraint.enabled = value
+        return
 
     for bone in bones:
         constraints = bone.constraints
@@ -112,19 +369,73 @@ def delete_temp_constraints() -> None:
 
 
 
-def create_pose(pose: bpy.types.PropertyGroup, for_edit: bool=False) -> None:
-    """Creates the pose. Handles both regular and combo poses."""
+def create_edit_constraints(ap_pose: bpy.types.PropertyGroup) -> None:
+    """Creates temporary constraints for the poses that go into a combo. Used in Edit Action mode."""
+    armature = bpy.context.active_object.data
+
+    # Recursive enabling of combo poses.
+    # Needed so that the edit combines all poses that go into combos+combos
+    if ap_pose.type == 'COMBO':
+        cache = {}
+        nested_pose_list = [ap_pose.corr_pose_A, ap_pose.corr_pose_B]
+        seen = set()
+        # Walked by position rather than pop(0), and every pose only once, so the walk stays linear
+        for name in nested_pose_list:
+            pose = get_pose(armature, name, cache)
+            if not pose or name in seen:
+                continue
+            seen.add(name)
+            if pose.type == 'COMBO':
+                nested_pose_list.append(pose.corr_pose_A)
+                nested_pose_list.append(pose.corr_pose_B)
+            create_pose(pose, for_edit=True, cache=cache)
+
+def switch_action_edit(obj: bpy.types.Object, ap_pose: bpy.types.PropertyGroup) -> None:
+    """Swaps the edited pose without leaving Edit Action mode.
+        The stored bone snapshot stays in place, only the action and the combo preview constraints change.
+    """
+    if not obj.animation_data:
+        obj.animation_data_create()
+    obj.animation_data.action = ap_pose.action
+
+    # Whatever the previous action posed and the new one doesn't key goes back to rest
+    reset_pose_transforms(obj, ap_pose.action)
+
+    delete_temp_constraints()
+    create_edit_constraints(ap_pose)
+
+def create_pose(pose: bpy.types.PropertyGroup, for_edit: bool=False, cache: dict=None, profile: BuildProfile=None) -> bool:
+    """Creates the pose. Handles both regular and combo poses.
+        Returns False if the pose's driver needs full Python evaluation.
+    """
     context = bpy.context
     armature = context.active_object.data
     pose_bones = context.active_object.pose.bones
     ap_bones = pose.bones
     prefs = context.scene.ap_preferences
+    profile = profile or BuildProfile()
 
     constraint_name = prefs.constraint_prefix + pose.name
     armature[constraint_name] = 0.0
     
     variables = {}
-    collect_all_variables(pose, variables)
+    with profile.phase('variables', pose.name):
+        collect_all_variables(pose, variables, cache)
+    profile.count('variables', len(variables))
+
+    # Shared mode evaluates the driver math once into the armature property
+    shared = prefs.driver_mode == 'SHARED' and not for_edit
+    # Handler mode leaves the constraints undriven, the runtime handler writes their eval_time
+    runtime = prefs.driver_mode == 'HANDLER' and not for_edit
+    if shared:
+        with profile.phase('drivers', pose.name):
+            shared_driver = add_action_driver(pose, armature, '["' + constraint_name + '"]', variables)
+        profile.count('drivers')
+
+    if not for_edit:
+        entry = armature.ap_manifest.add()
+        entry.name = constraint_name
+        entry.pose = pose.name
 
     for ap_bone in ap_bones:
         if ap_bone.bone not in pose_bones:
@@ -133,61 +444,136 @@ def create_pose(pose: bpy.types.PropertyGroup, for_edit: bool=False) -> None:
         bone = pose_bones[ap_bone.bone]
         influence = ap_bone.influence
 
-        constraint = bone.constraints.new('ACTION')
-        constraint.name = constraint_name
+        with profile.phase('constraints', pose.name):
+            constraint = bone.constraints.new('ACTION')
+            constraint.name = constraint_name
 
-        constraint.action = pose.action
-        constraint.frame_start = pose.start_frame
-        constraint.frame_end = pose.end_frame
-        constraint.mix_mode = pose.mix
-        constraint.influence = influence
-        constraint.use_eval_time = True
+            constraint.action = pose.action
+            constraint.frame_start = pose.start_frame
+            constraint.frame_end = pose.end_frame
+            constraint.mix_mode = pose.mix
+            constraint.influence = influence
+            constraint.use_eval_time = True
+        profile.count('constraints')
 
         # add driver to constraint
-        add_action_driver(pose, constraint, 'eval_time', variables)
+        if not runtime:
+            with profile.phase('drivers', pose.name):
+                if shared:
+                    add_driver_constraint(constraint, pose)
+                else:
+                    add_action_driver(pose, constraint, 'eval_time', variables)
+            profile.count('drivers')
         if for_edit:
             constraint.name = 'AP-edit_mode_temp_constraint'
+        else:
+            entry.bones.add().name = bone.name
+
+    profile.count('poses')
+    if runtime:
+        return True
 
-    add_action_driver(pose, pose, 'influence', variables)
+    with profile.phase('drivers', pose.name):
+        if shared:
+            # The influence reads the shared property too, the expression only runs once per pose
+            add_driver_constraint(pose, pose, 'influence')
+            driver = shared_driver
+        else:
+            driver = add_action_driver(pose, pose, 'influence', variables)
+    profile.count('drivers')
+
+    return is_simple_expression(driver.expression, set(variables.keys()))
 
 def find_opposite_bone_name(bone: str) -> str:
     """Returns for the symmetrical bone name."""
-    try:
-        return bpy.context.active_object.data.bones[swap_side_suffix(bone)].name
-    except:
-        return None
+    return bone_index(bpy.context.active_object.data).get(bone)
 
 def find_opposite_object_name(object: str) -> str:
     """Returns for the symmetrical object name."""
-    try:
-        return bpy.data.objects[swap_side_suffix(object)].name
-    except:
-        return None
+    return object_index().get(object)
 
 def find_opposite_action_name(action: str) -> str:
     """Returns the opposite action name."""
-    try:
-        return bpy.data.actions[swap_side_suffix(object)].name
-    except:
-        return None
+    return action_index().get(action)
 
 def find_opposite_pose_name(pose: str) -> str:
     """Returns the opposite pose name."""
-    try:
-        return bpy.context.active_object.data.ap_poses[swap_side_suffix(pose)].name
-    except:
-        return None
+    return pose_index(bpy.context.active_object.data).get(pose)
 
 def swap_side_suffix(name: str) -> str:
-    """String operation that swaps the side suffixes."""
-    prefs = bpy.context.scene.ap_preferences
+    """String operation that swaps the side of a name, using all symmetry conventions."""
+    return swap_name(name)
 
-    if name.endswith(prefs.left_suffix):
-        return name[:-len(prefs.left_suffix)] + prefs.right_suffix
-    elif name.endswith(prefs.right_suffix):
-        return name[:-len(prefs.right_suffix)] + prefs.left_suffix
-    else:
-        return name
+def bone_symmetry_map(armature: bpy.types.Armature) -> dict:
+    """Maps every bone that has an opposite bone to the opposite's name. Shared cache, don't modify it."""
+    return bone_index(armature)
+
+def mirror_channel(channel: str) -> bool:
+    """Checks if a driver channel changes sign when mirrored across X."""
+    return channel in ('LOC_X', 'ROT_Y', 'ROT_Z')
+
+def mirror_pose_record(record: dict, bone_map: dict) -> dict:
+    """Returns the opposite side version of a pose record from pose_to_dict."""
+    mirrored = dict(record)
+    mirrored['name'] = swap_side_suffix(record['name'])
+
+    if record['target']:
+        mirrored['target'] = find_opposite_object_name(record['target']) or record['target']
+    mirrored['bone'] = bone_map.get(record['bone'], record['bone'])
+    # Channels that flip sign across X need a flipped range to trigger on the opposite side
+    if record['target_type'] == 'BONE' and mirror_channel(record['channel']):
+        mirrored['transform_min'] = -record['transform_min']
+        mirrored['transform_max'] = -record['transform_max']
+
+    mirrored['corr_pose_A'] = swap_side_suffix(record['corr_pose_A'])
+    mirrored['corr_pose_B'] = swap_side_suffix(record['corr_pose_B'])
+    mirrored['bones'] = [[bone_map.get(bone, bone), influence] for bone, influence in record['bones']]
+
+    return mirrored
+
+def mirror_action(action: bpy.types.Action, name: str, bone_map: dict) -> bpy.types.Action:
+    """Creates or overwrites the action name with an X mirrored copy of action.
+        Curves are moved to the opposite bones and the components that flip across X are negated
+        over whole keyframe arrays at once.
+    """
+    mirrored = action.copy()
+    existing = bpy.data.actions.get(name)
+    if existing and existing != action:
+        # Whatever used the old opposite action now uses the new one
+        existing.user_remap(mirrored)
+        bpy.data.actions.remove(existing)
+    mirrored.name = name
+    mirrored.use_fake_user = True
+    # Remapped poses now show another action name, and remapping runs no update callbacks
+    clear_list_cache()
+
+    prefix = 'pose.bones["'
+    for fcurve in mirrored.fcurves:
+        path = fcurve.data_path
+        if not path.startswith(prefix):
+            continue
+        bone, _, channel = path[len(prefix):].partition('"].')
+        if bone in bone_map:
+            fcurve.data_path = prefix + bone_map[bone] + '"].' + channel
+
+        if fcurve.array_index not in MIRROR_FLIPS.get(channel, ()):
+            continue
+        points = fcurve.keyframe_points
+        for attribute in ('co', 'handle_left', 'handle_right'):
+            values = np.empty(len(points) * 2, dtype=np.float32)
+            points.foreach_get(attribute, values)
+            values[1::2] *= -1.0
+            points.foreach_set(attribute, values)
+        fcurve.update()
+
+    # Two passes, so swapping a left and a right group never clashes on names
+    groups = [group for group in mirrored.groups if group.name in bone_map]
+    for group in groups:
+        group.name = '__ap_mirror__' + group.name
+    for group in groups:
+        group.name = bone_map[group.name[len('__ap_mirror__'):]]
+
+    return mirrored
 
 def reset_bone_transforms(name: str) -> None:
     """Resets the bone transforms to default."""
@@ -197,16 +583,250 @@ def reset_bone_transforms(name: str) -> None:
     pose_bone.rotation_quaternion = (1.0, 0.0, 0.0, 0.0)
     pose_bone.scale = (1.0, 1.0, 1.0)
 
-def add_driver_constraint(constraint: bpy.types.Constraint, pose: bpy.types.PropertyGroup) -> bpy.types.Driver:
-    """Adds a driver to the Action Constraint's evaluation time."""
-    
-    driver = constraint.driver_add('eval_time').driver
+def read_bone_transforms(obj: bpy.types.Object) -> dict:
+    """Reads the transform channels of all pose bones into flat arrays."""
+    pose_bones = obj.pose.bones
+    transforms = {}
+
+    for channel, rest in REST_TRANSFORMS.items():
+        values = np.empty(len(pose_bones) * len(rest), dtype=np.float32)
+        pose_bones.foreach_get(channel, values)
+        transforms[channel] = values
+
+    return transforms
+
+def write_bone_transforms(obj: bpy.types.Object, transforms: dict) -> None:
+    """Writes flat transform arrays back to all pose bones in one call per channel."""
+    pose_bones = obj.pose.bones
+
+    for channel, values in transforms.items():
+        pose_bones.foreach_set(channel, values)
+    obj.update_tag()
+
+def keyed_transform_mask(obj: bpy.types.Object, action: bpy.types.Action) -> dict:
+    """Returns per channel flat boolean arrays marking the bone transform components the action keys."""
+    index = {pose_bone.name: i for i, pose_bone in enumerate(obj.pose.bones)}
+    mask = {channel: np.zeros(len(index) * len(rest), dtype=bool) for channel, rest in REST_TRANSFORMS.items()}
+
+    if not action:
+        return mask
+
+    for fcurve in action.fcurves:
+        path = fcurve.data_path
+        if not path.startswith('pose.bones["'):
+            continue
+        name, _, channel = path[len('pose.bones["'):].partition('"].')
+        if channel not in mask or name not in index:
+            continue
+        size = len(REST_TRANSFORMS[channel])
+        if fcurve.array_index < size:
+            mask[channel][index[name] * size + fcurve.array_index] = True
+
+    return mask
+
+def reset_pose_transforms(obj: bpy.types.Object, action: bpy.types.Action=None, transforms: dict=None) -> None:
+    """Resets pose bone transforms to default.
+        Only components that are off their rest value and not keyed by the action are touched,
+        channels without such components are not written at all.
+    """
+    if transforms is None:
+        transforms = read_bone_transforms(obj)
+    keyed = keyed_transform_mask(obj, action)
+    count = len(obj.pose.bones)
+
+    changed = {}
+    for channel, rest in REST_TRANSFORMS.items():
+        rest_values = np.tile(np.array(rest, dtype=np.float32), count)
+        dirty = (transforms[channel] != rest_values) & ~keyed[channel]
+        if dirty.any():
+            changed[channel] = np.where(dirty, rest_values, transforms[channel])
+
+    if changed:
+        write_bone_transforms(obj, changed)
+
+def store_bone_transforms(obj: bpy.types.Object) -> dict:
+    """Stores a snapshot of all pose bone transforms on the armature as flat arrays.
+        Returns the arrays that were read.
+    """
+    transforms = read_bone_transforms(obj)
+    snapshot = {channel: values.tolist() for channel, values in transforms.items()}
+    snapshot['names'] = [pose_bone.name for pose_bone in obj.pose.bones]
+    snapshot['rotation_mode'] = [pose_bone.rotation_mode for pose_bone in obj.pose.bones]
+
+    obj.data['ap_bone_snapshot'] = snapshot
+
+    return transforms
+
+def restore_bone_transforms(obj: bpy.types.Object) -> None:
+    """Restores the pose bone transforms from the armature's snapshot and removes it.
+        Channels that already match the snapshot are not written.
+    """
+    snapshot = obj.data.get('ap_bone_snapshot')
+    if not snapshot:
+        return
+
+    pose_bones = obj.pose.bones
+    names = list(snapshot['names'])
+    transforms = {channel: np.array(snapshot[channel], dtype=np.float32) for channel in REST_TRANSFORMS.keys()}
+
+    # Rotation modes go first, changing them converts the rotation values
+    rotation_modes = list(snapshot['rotation_mode'])
+    if names == [pose_bone.name for pose_bone in pose_bones]:
+        for pose_bone, rotation_mode in zip(pose_bones, rotation_modes):
+            if pose_bone.rotation_mode != rotation_mode:
+                pose_bone.rotation_mode = rotation_mode
+    else:
+        # Bone list changed while editing, fall back to restoring by name
+        current = read_bone_transforms(obj)
+        index = {pose_bone.name: i for i, pose_bone in enumerate(pose_bones)}
+        for i, name in enumerate(names):
+            if name not in index:
+                continue
+            pose_bones[index[name]].rotation_mode = rotation_modes[i]
+            for channel, rest in REST_TRANSFORMS.items():
+                size = len(rest)
+                current[channel][index[name] * size:(index[name] + 1) * size] = transforms[channel][i * size:(i + 1) * size]
+        transforms = current
+
+    current = read_bone_transforms(obj)
+    changed = {channel: values for channel, values in transforms.items() if not np.array_equal(values, current[channel])}
+    if changed:
+        write_bone_transforms(obj, changed)
+
+    del obj.data['ap_bone_snapshot']
+
+def remove_flat_curves(action: bpy.types.Action, tolerance: float=0.00001) -> tuple:
+    """Removes curves whose keyframe values stay within the tolerance, and groups left empty.
+        Returns the number of removed curves and groups.
+    """
+    curves = 0
+    for fcurve in list(action.fcurves):
+        points = fcurve.keyframe_points
+        if len(points):
+            coordinates = np.empty(len(points) * 2, dtype=np.float32)
+            points.foreach_get('co', coordinates)
+            values = coordinates[1::2]
+            if values.max() - values.min() > tolerance:
+                continue
+        action.fcurves.remove(fcurve)
+        curves += 1
+
+    groups = 0
+    for group in list(action.groups):
+        if len(group.channels) == 0:
+            action.groups.remove(group)
+            groups += 1
+
+    return curves, groups
+
+def decimate_action(action: bpy.types.Action, tolerance: float, frames: tuple=(), samples: int=4) -> tuple:
+    """Removes keys that can be dropped without the curves moving more than the tolerance.
+        Keys on the given frames are always kept, so the pose at those frames is preserved.
+        Returns the key counts before and after.
+    """
+    before = 0
+    after = 0
+    for fcurve in action.fcurves:
+        count = len(fcurve.keyframe_points)
+        before += count
+        after += decimate_fcurve(fcurve, tolerance, frames, samples) if count > 2 else count
+
+    return before, after
+
+def decimate_fcurve(fcurve: bpy.types.FCurve, tolerance: float, frames: tuple=(), samples: int=4) -> int:
+    """Decimates one curve. Returns the number of keys left."""
+    points = fcurve.keyframe_points
+    count = len(points)
+
+    co = np.empty(count * 2, dtype=np.float32)
+    points.foreach_get('co', co)
+    co = co.reshape(-1, 2)
+    key_frames = co[:, 0]
+    key_values = co[:, 1]
+
+    # Reference samples of the untouched curve
+    sample_count = max(count * samples, int((key_frames[-1] - key_frames[0]) * samples) + 1)
+    sample_frames = np.linspace(key_frames[0], key_frames[-1], sample_count)
+    reference = np.array([fcurve.evaluate(frame) for frame in sample_frames])
+
+    keep = np.zeros(count, dtype=bool)
+    keep[0] = keep[-1] = True
+    keep |= np.isin(np.round(key_frames), np.round(np.asarray(frames, dtype=np.float32)))
+
+    # Split segments at the sample that deviates most from a straight line until every segment fits
+    segments = [(0, count - 1)]
+    while segments:
+        first, last = segments.pop()
+        if last - first < 2:
+            continue
+        inside = (sample_frames >= key_frames[first]) & (sample_frames <= key_frames[last])
+        line = np.interp(sample_frames[inside], key_frames[[first, last]], key_values[[first, last]])
+        error = np.abs(line - reference[inside])
+        if error.size == 0 or error.max() <= tolerance:
+            continue
+        worst = sample_frames[inside][error.argmax()]
+        split = first + 1 + int(np.abs(key_frames[first + 1:last] - worst).argmin())
+        keep[split] = True
+        segments.append((first, split))
+        segments.append((split, last))
+
+    if keep.all():
+        return count
+
+    # Handles get recalculated after removing keys, so the result is checked against the reference
+    backup = read_keyframes(fcurve)
+    for i in reversed(np.flatnonzero(~keep)):
+        points.remove(points[int(i)], fast=True)
+    fcurve.update()
+
+    result = np.array([fcurve.evaluate(frame) for frame in sample_frames])
+    if np.abs(result - reference).max() > tolerance:
+        write_keyframes(fcurve, backup)
+        return count
+
+    return int(keep.sum())
+
+def read_keyframes(fcurve: bpy.types.FCurve) -> dict:
+    """Copies all keyframe data of a curve so it can be written back."""
+    points = fcurve.keyframe_points
+    keyframes = {}
+    for attribute in ('co', 'handle_left', 'handle_right'):
+        values = np.empty(len(points) * 2, dtype=np.float32)
+        points.foreach_get(attribute, values)
+        keyframes[attribute] = values
+    keyframes['types'] = [(point.interpolation, point.handle_left_type, point.handle_right_type, point.easing) for point in points]
+
+    return keyframes
+
+def write_keyframes(fcurve: bpy.types.FCurve, keyframes: dict) -> None:
+    """Replaces the keyframes of a curve with data from read_keyframes."""
+    points = fcurve.keyframe_points
+    for point in reversed(list(points)):
+        points.remove(point, fast=True)
+
+    points.add(len(keyframes['types']))
+    for attribute in ('co', 'handle_left', 'handle_right'):
+        points.foreach_set(attribute, keyframes[attribute])
+    for point, (interpolation, handle_left_type, handle_right_type, easing) in zip(points, keyframes['types']):
+        point.interpolation = interpolation
+        point.handle_left_type = handle_left_type
+        point.handle_right_type = handle_right_type
+        point.easing = easing
+    fcurve.update()
+
+def add_driver_constraint(constraint: bpy.types.Constraint, pose: bpy.types.PropertyGroup, property: str='eval_time') -> bpy.types.Driver:
+    """Adds a driver to the Action Constraint's evaluation time, or another property of the given struct.
+        Reads the pose's shared armature property, so no expression is needed.
+    """
+    prefs = bpy.context.scene.ap_preferences
+
+    driver = constraint.driver_add(property).driver
     driver.type = 'AVERAGE'
     variable = driver.variables.new()
     variable.name = 'source'
     variable.targets[0].id_type = 'ARMATURE'
     variable.targets[0].id = bpy.context.active_object.data
-    variable.targets[0].data_path = 'ap_poses["' + pose.name + '"].influence'
+    variable.targets[0].data_path = '["' + prefs.constraint_prefix + pose.name + '"]'
 
     return driver
 
@@ -247,10 +867,9 @@ def add_driver_influence(pose: bpy.types.PropertyGroup) -> bpy.types.Driver:
     elif pose.target_type == 'PROP':
         variable.targets[0].data_path = pose.data_path
     
-    driver_str = '(driver - '
-    if 'ROT' in pose.channel:
-        driver_str = '(degrees(driver) - '
-    driver.expression = driver_str + str(pose.transform_min) + ') / (' + str(pose.transform_max) + ' - ' + str(pose.transform_min) + ')'
+    rotation = pose.target_type == 'BONE' and 'ROT' in pose.channel
+    scale, offset = fold_range(pose.transform_min, pose.transform_max, rotation)
+    driver.expression = compile_expression([('driver', scale, offset)])
 
     return driver
 
@@ -259,64 +878,209 @@ def update_ap_poses_index(self, context: bpy.types.Context) -> None:
     armature = context.active_object.data
 
     if armature.ap_state.editing:
-        #Leave current action edit
-        bpy.ops.armature.ap_action_edit(idx = armature.ap_poses_index)
-        #Enter new action edit with updated action
-        bpy.ops.armature.ap_action_edit(idx = armature.ap_poses_index)
+        ap_pose = armature.ap_poses[armature.ap_poses_index] if 0 <= armature.ap_poses_index < len(armature.ap_poses) else None
+        if ap_pose and ap_pose.action:
+            switch_action_edit(context.active_object, ap_pose)
+        else:
+            #Leave action edit, there is nothing to edit on the new pose
+            bpy.ops.armature.ap_action_edit(idx = armature.ap_poses_index)
+
+def collect_all_variables(pose: bpy.types.PropertyGroup, variables: dict, cache: dict=None) -> dict:
+    """Collects all the variables to be used in the pose's driver expression.
+        Every distinct driver input becomes one variable, no matter how many combo paths reach it.
+        Pass the same cache for a whole build so nested combos are only walked once.
+    """
+    if cache is None:
+        cache = {}
+
+    for spec in collect_inputs(pose, cache).values():
+        variables["var" + str(len(variables.keys()))] = dict(spec)
+
+    return variables
 
-def collect_all_variables(pose: bpy.types.PropertyGroup, variables: dict) -> dict:
-    """Collects all the variables to be used in the pose's driver expression."""
+def collect_inputs(pose: bpy.types.PropertyGroup, cache: dict) -> dict:
+    """Returns the pose's distinct driver inputs keyed by input_key. Memoized in cache by pose name."""
+    if pose.name in cache:
+        return cache[pose.name]
+
+    inputs = {}
+    # Registered before recursing so that cyclic combos terminate
+    cache[pose.name] = inputs
 
     if pose.type == 'COMBO':
         if not pose.corr_pose_A or not pose.corr_pose_B:
-            return
-        collect_all_variables(bpy.context.active_object.data.ap_poses[pose.corr_pose_A], variables)
-        collect_all_variables(bpy.context.active_object.data.ap_poses[pose.corr_pose_B], variables)
+            return inputs
+        # The pose's own armature, so the runtime handler can collect inputs for rigs that aren't active
+        armature = pose.id_data
+        for name in (pose.corr_pose_A, pose.corr_pose_B):
+            corr_pose = get_pose(armature, name, cache)
+            if not corr_pose:
+                continue
+            for key, spec in collect_inputs(corr_pose, cache).items():
+                inputs.setdefault(key, spec)
     else:
-        var_name = "var" + str(len(variables.keys()))
-        variables[var_name] = {}
-        variables[var_name]['target'] = pose.target
+        spec = {}
+        spec['target'] = pose.target
+        spec['transform_min'] = pose.transform_min
+        spec['transform_max'] = pose.transform_max
 
         if pose.target_type == 'BONE':
-            variables[var_name]['bone_target'] = pose.bone
-            variables[var_name]['transform_type'] = pose.channel
-            variables[var_name]['transform_space'] = pose.space
-            variables[var_name]['transform_min'] = pose.transform_min
-            variables[var_name]['transform_max'] = pose.transform_max
+            spec['bone_target'] = pose.bone
+            spec['transform_type'] = pose.channel
+            spec['transform_space'] = pose.space
             if 'ROT' in pose.channel:
-                variables[var_name]['rot_mode'] = pose.rot_mode
+                spec['rot_mode'] = pose.rot_mode
         elif pose.target_type == 'PROP':
-            variables[var_name]['data_path'] = pose.data_path
+            spec['data_path'] = pose.data_path
+
+        inputs[input_key(pose)] = spec
+
+    return inputs
+
+def input_key(pose: bpy.types.PropertyGroup) -> tuple:
+    """Returns the key that identifies a pose's driver input: target, bone, channel, space, rotation mode and range."""
+    target = pose.target.name if pose.target else ''
+
+    if pose.target_type == 'PROP':
+        return (target, pose.data_path, '', '', '', pose.transform_min, pose.transform_max)
+
+    rot_mode = pose.rot_mode if 'ROT' in pose.channel else ''
+    return (target, pose.bone, pose.channel, pose.space, rot_mode, pose.transform_min, pose.transform_max)
+
+def input_value(spec: dict, normalized: float) -> float:
+    """Returns the raw driver value at which an input's term reaches the normalized value."""
+    value = spec['transform_min'] + (spec['transform_max'] - spec['transform_min']) * normalized
+    if 'ROT' in spec.get('transform_type', ''):
+        return math.radians(value)
+    return value
+
+def write_input(spec: dict, value: float) -> bool:
+    """Sets a driver input to a raw value. Returns False if the input can't be written.
+        Bone inputs are written to the bone's own transform channels, which is what Local and Transform space read.
+    """
+    target = spec['target']
+    if not target:
+        return False
+    if 'data_path' in spec:
+        return write_path(target, spec['data_path'], value)
+
+    pose_bone = target.pose.bones.get(spec['bone_target']) if target.pose else None
+    if not pose_bone:
+        return False
 
-def add_action_driver(pose: bpy.types.PropertyGroup, target_obj: bpy.types.ActionConstraint, property: str, variables: dict) -> None:
-    """Adds a driver to the action constraint with the given variables"""
+    channel = spec['transform_type']
+    axis = 'XYZW'.find(channel[-1])
+    if channel.startswith('LOC'):
+        pose_bone.location[axis] = value
+    elif channel == 'SCALE_AVG':
+        pose_bone.scale = (value, value, value)
+    elif channel.startswith('SCALE'):
+        pose_bone.scale[axis] = value
+    elif pose_bone.rotation_mode == 'QUATERNION':
+        if channel == 'ROT_W':
+            pose_bone.rotation_quaternion[0] = value
+        else:
+            pose_bone.rotation_quaternion = Quaternion(AXES[axis], value)
+    elif pose_bone.rotation_mode == 'AXIS_ANGLE':
+        if channel == 'ROT_W':
+            return False
+        pose_bone.rotation_axis_angle = (value,) + AXES[axis]
+    elif channel != 'ROT_W':
+        pose_bone.rotation_euler[axis] = value
+    else:
+        return False
+
+    return True
+
+def write_path(target: bpy.types.ID, data_path: str, value: float) -> bool:
+    """Sets the single value property at a data path. Returns False if it can't be written."""
+    try:
+        current = target.path_resolve(data_path)
+        value = type(current)(value)
+        if data_path.endswith(']'):
+            start = data_path.rfind('[')
+            parent, key = data_path[:start], data_path[start + 1:-1]
+            owner = target.path_resolve(parent) if parent else target
+            owner[key[1:-1] if key[:1] in '\'"' else int(key)] = value
+        else:
+            parent, _, attribute = data_path.rpartition('.')
+            owner = target.path_resolve(parent) if parent else target
+            setattr(owner, attribute, value)
+    except (ValueError, TypeError, AttributeError, KeyError, IndexError):
+        return False
+
+    return True
+
+def snapshot_inputs(specs) -> dict:
+    """Reads the current state of everything write_input touches for the given inputs."""
+    snapshot = {'bones': {}, 'paths': []}
+    for spec in specs:
+        target = spec['target']
+        if not target:
+            continue
+        if 'data_path' in spec:
+            try:
+                snapshot['paths'].append((target, spec['data_path'], target.path_resolve(spec['data_path'])))
+            except (ValueError, TypeError):
+                pass
+        elif target.pose and target.name not in snapshot['bones']:
+            transforms = read_bone_transforms(target)
+            axis_angle = np.empty(len(target.pose.bones) * 4, dtype=np.float32)
+            target.pose.bones.foreach_get('rotation_axis_angle', axis_angle)
+            transforms['rotation_axis_angle'] = axis_angle
+            snapshot['bones'][target.name] = (target, transforms)
+
+    return snapshot
+
+def restore_inputs(snapshot: dict) -> None:
+    """Writes back a snapshot taken by snapshot_inputs."""
+    for target, transforms in snapshot['bones'].values():
+        write_bone_transforms(target, transforms)
+    for target, data_path, value in snapshot['paths']:
+        write_path(target, data_path, value)
+
+def add_action_driver(pose: bpy.types.PropertyGroup, target_obj: bpy.types.ActionConstraint, property: str, variables: dict) -> bpy.types.Driver:
+    """Adds a driver to the action constraint with the given variables.
+        Ranges are folded at build time so the expression stays on Blender's simple expression fast path.
+    """
 
     driver = target_obj.driver_add(property).driver
     driver.type = 'SCRIPTED'
 
-    expression = 'min('
+    terms = []
 
     for key in variables.keys():
         variable = driver.variables.new()
         variable.name = key
-        variable.targets[0].id = variables[key]['target']
 
-        if pose.target_type == 'BONE':
+        if 'data_path' in variables[key].keys():
+            variable.targets[0].id = variables[key]['target']
+            variable.targets[0].data_path = variables[key]['data_path']
+        else:
             variable.type = 'TRANSFORMS'
+            variable.targets[0].id = variables[key]['target']
             variable.targets[0].bone_target = variables[key]['bone_target']
             variable.targets[0].transform_type = variables[key]['transform_type']
             variable.targets[0].transform_space = variables[key]['transform_space']
             if 'rot_mode' in variables[key].keys():
                 variable.targets[0].rotation_mode = variables[key]['rot_mode']
-        elif pose.target_type == 'PROP':
-            variable.targets[0].data_path = variables[key]['data_path']
 
-        var_expression = '( ' + key + ' - '
-        if 'ROT' in variables[key]['transform_type']:
-            var_expression = '(degrees( ' + key + ') - '
-        expression += var_expression + str(variables[key]['transform_min']) + ') / (' + str(variables[key]['transform_max']) + ' - ' + str(variables[key]['transform_min']) + '), '
+        rotation = 'ROT' in variables[key].get('transform_type', '')
+        scale, offset = fold_range(variables[key]['transform_min'], variables[key]['transform_max'], rotation)
+        terms.append((key, scale, offset))
+
+    driver.expression = compile_expression(terms)
 
-    expression = expression[:-2] + ')'
+    return driver
 
-    driver.expression = expression
+def register():
+    subscribe_lists()
+    bpy.app.handlers.load_post.append(clear_caches_on_load)
+    bpy.app.handlers.undo_post.append(clear_caches)
+    bpy.app.handlers.redo_post.append(clear_caches)
 
+def unregister():
+    bpy.msgbus.clear_by_owner(list_owner)
+    bpy.app.handlers.load_post.remove(clear_caches_on_load)
+    bpy.app.handlers.undo_post.remove(clear_caches)
+    bpy.app.handlers.redo_post.remove(clear_caches)